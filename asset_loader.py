@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AssetTask:
+    """Задача загрузки: декодирование в потоке пула и обработка результата в главном потоке"""
+
+    def __init__(self, name, future, on_done, required):
+        self.name = name
+        self.future = future
+        self.on_done = on_done
+        self.required = required
+        self.done = False
+
+
+class AssetLoader:
+    """Загрузка ресурсов в пуле потоков с передачей готовых ресурсов в главный поток
+
+    Функция загрузки выполняется в потоке пула и должна только читать файлы и
+    декодировать их (без convert(), экрана и общих словарей). Ее результат
+    передается в on_done в главном потоке из process_finished, который игра
+    вызывает каждый шаг.
+    """
+
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="assets")
+        self.tasks = []
+        # Счетчики для прогресса: поставлено задач и обработано в главном потоке
+        self.total_count = 0
+        self.processed_count = 0
+        # Время загрузки в потоке: [(имя, мс)] в порядке завершения обработки
+        self.timings = []
+
+    def add(self, name, load, *args, on_done=None, required=False):
+        """Постановка загрузки в очередь; required - ресурс нужен до показа меню"""
+        def run():
+            start = time.perf_counter()
+            result = load(*args)
+            return result, (time.perf_counter() - start) * 1000
+
+        task = AssetTask(name, self.executor.submit(run), on_done, required)
+        self.tasks.append(task)
+        self.total_count += 1
+        return task
+
+    def process_finished(self, required_only=False):
+        """Обработка загруженных ресурсов в главном потоке, возвращает количество обработанных"""
+        processed = 0
+        for task in self.tasks:
+            if task.done or not task.future.done() or (required_only and not task.required):
+                continue
+            task.done = True
+            processed += 1
+            try:
+                result, load_ms = task.future.result()
+            except Exception as e:
+                print(f"Ошибка загрузки ресурса {task.name}: {e}")
+                continue
+            self.timings.append((task.name, load_ms))
+            if task.on_done:
+                task.on_done(result)
+        if processed:
+            self.processed_count += processed
+            self.tasks = [task for task in self.tasks if not task.done]
+        return processed
+
+    def get_progress(self):
+        """Доля завершенных загрузок от 0 до 1"""
+        if not self.total_count:
+            return 1.0
+        finished = sum(1 for task in self.tasks if task.future.done())
+        return (self.processed_count + finished) / self.total_count
+
+    def is_ready(self):
+        """Все обязательные ресурсы загружены и обработаны"""
+        return not any(task.required for task in self.tasks)
+
+    def is_finished(self):
+        """Все ресурсы загружены и обработаны"""
+        return not self.tasks
+
+    def get_pending_names(self):
+        """Имена еще не обработанных ресурсов"""
+        return [task.name for task in self.tasks]
+
+    def wait_required(self):
+        """Ожидание обязательных ресурсов (если они понадобились раньше, чем загрузились)"""
+        for task in self.tasks:
+            if task.required:
+                task.future.exception()
+        self.process_finished(required_only=True)
+
+    def shutdown(self):
+        """Остановка пула без ожидания незапущенных загрузок"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,481 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from level import Level
+from level_generator import generate_level, get_cached_level
+from level_state import LevelState
+from sprite_loader import SpriteLoader
+from tile_grid import EMPTY, TILE_CODES
+
+# Размеры карт и количество объектов для замеров физики и отрисовки
+MAP_CASES = [
+    (15, 12, 10),
+    (30, 20, 100),
+    (100, 100, 1000),
+    (300, 300, 10000),
+    (1000, 1000, 100000),
+]
+QUICK_MAP_CASES = MAP_CASES[:3]
+
+GROUPS = ['physics', 'render', 'startup']
+
+# Допустимое замедление p50 относительно базового прогона (доля)
+DEFAULT_THRESHOLD = 0.15
+# Разница меньше этой (мс) считается шумом даже при большом относительном росте
+DEFAULT_MIN_DELTA = 0.01
+
+
+def init_display():
+    """Инициализация pygame без окна (нужна для convert_alpha в SpriteLoader)"""
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+
+def percentile(samples, fraction):
+    """Перцентиль отсортированной выборки с линейной интерполяцией"""
+    position = (len(samples) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(samples) - 1)
+    return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+
+def measure(func, setup=None, warmup=3, repeats=20):
+    """Замер функции: прогрев и repeats повторов, setup перед каждым вызовом не замеряется"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    samples = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'unit': 'ms',
+        'warmup': warmup,
+        'repeats': repeats,
+        'min': samples[0],
+        'mean': sum(samples) / len(samples),
+        'p50': percentile(samples, 0.5),
+        'p90': percentile(samples, 0.9),
+        'p99': percentile(samples, 0.99),
+        'max': samples[-1],
+    }
+
+
+def make_level(sprite_loader, object_count, seed=1, width=None, height=None):
+    """Создание уровня с заданным количеством объектов (без sprite_loader - без pygame)"""
+    rng = random.Random(seed)
+    if width is None or height is None:
+        width = height = max(15, int((object_count * 3) ** 0.5) + 2)
+    if sprite_loader is None:
+        level = LevelState(None, 1, width=width, height=height, seed=seed)
+    else:
+        level = Level(sprite_loader, None, 1, width=width, height=height, seed=seed)
+    level.clear_objects()
+
+    free_cells = [(x, y) for x, y in level.tiles.positions(EMPTY)
+                  if 0 < x < width - 1 and 0 < y < height - 1]
+    rng.shuffle(free_cells)
+    for x, y in free_cells[:object_count]:
+        object_type = rng.choice(['crystal', 'stone'])
+        obj = level.new_object(x * level.tile_size, y * level.tile_size, object_type)
+        obj.can_fall = True
+        level.add_object(obj)
+    return level
+
+
+def make_level_data(level):
+    """Карта в формате LevelData: объекты уровня записаны кодами в клетки"""
+    tiles = level.tiles.copy()
+    for obj in level.game_objects:
+        tiles.set(*obj.get_tile_pos(), TILE_CODES[obj.object_type])
+    return {'tiles': tiles, 'player_start': level.get_player_start_position()}
+
+
+def finish_movements(level):
+    """Завершение всех начатых движений, как если бы прошло move_duration"""
+    store = level.objects
+    for object_id in sorted(store.moving):
+        store.finish_movement(object_id)
+
+
+def wake_all(level):
+    """Пробуждение всех объектов - худший случай для тика гравитации"""
+    finish_movements(level)
+    for obj in level.game_objects:
+        if obj.active:
+            level.wake_object(obj)
+
+
+def settle(level, max_ticks=10000):
+    """Прогон гравитации, пока все объекты не улягутся; возвращает число тиков"""
+    ticks = 0
+    while level.awake_objects and ticks < max_ticks:
+        level.apply_gravity(1, 1)
+        finish_movements(level)
+        ticks += 1
+    return ticks
+
+
+def scan_object_at(objects, tile_x, tile_y):
+    """Объект в клетке перебором всех объектов (как get_object_at до индекса занятости)"""
+    for obj in objects:
+        if obj.active:
+            obj_tile_x, obj_tile_y = obj.get_tile_pos()
+            if obj_tile_x == tile_x and obj_tile_y == tile_y:
+                return obj
+    return None
+
+
+def scan_can_move_to(level, objects, tile_x, tile_y):
+    """can_object_move_to с поиском объекта перебором"""
+    if tile_x < 0 or tile_x >= level.width or tile_y < 0 or tile_y >= level.height:
+        return False
+    if level.get_tile(tile_x, tile_y) != 'empty':
+        return False
+    target_obj = scan_object_at(objects, tile_x, tile_y)
+    return not (target_obj and target_obj.active)
+
+
+def scan_fall_direction(level, objects, obj, player_tile_x, player_tile_y):
+    """get_object_fall_direction с поиском объектов перебором"""
+    if not obj.can_fall or obj.is_moving:
+        return None
+
+    obj_tile_x, obj_tile_y = obj.get_tile_pos()
+    if scan_can_move_to(level, objects, obj_tile_x, obj_tile_y + 1):
+        if obj_tile_x == player_tile_x and obj_tile_y + 1 == player_tile_y:
+            return None
+        return 'down'
+
+    if obj.object_type in ['stone', 'crystal']:
+        below_tile = level.get_tile(obj_tile_x, obj_tile_y + 1)
+        below_obj = scan_object_at(objects, obj_tile_x, obj_tile_y + 1)
+        can_slide = (below_tile in ['stone', 'brick_wall'] or
+                     (below_obj and below_obj.object_type in ['stone', 'crystal']))
+        if can_slide:
+            for direction, dx in [('right', 1), ('left', -1)]:
+                new_x = obj_tile_x + dx
+                if (scan_can_move_to(level, objects, new_x, obj_tile_y) and
+                        scan_can_move_to(level, objects, new_x, obj_tile_y + 1)):
+                    if not ((new_x == player_tile_x and obj_tile_y == player_tile_y) or
+                            (new_x == player_tile_x and obj_tile_y + 1 == player_tile_y)):
+                        return direction
+    return None
+
+
+def scan_apply_gravity(level, player_tile_x, player_tile_y):
+    """Старый apply_gravity: проверка всех объектов с поиском соседей перебором (O(n^2) за тик)"""
+    objects = level.game_objects
+    for obj in objects:
+        if not obj.active or obj.is_moving:
+            continue
+
+        direction = scan_fall_direction(level, objects, obj, player_tile_x, player_tile_y)
+        if direction:
+            target_x, target_y = obj.x, obj.y
+            if direction == 'down':
+                target_y += level.tile_size
+            elif direction == 'left':
+                target_x -= level.tile_size
+            elif direction == 'right':
+                target_x += level.tile_size
+
+            if obj.start_movement(target_x, target_y):
+                obj.fall_state = 'sliding' if direction in ['left', 'right'] else 'falling'
+
+
+def time_gravity(level, ticks, use_scan):
+    """Время одного тика гравитации (сек): новый apply_gravity или старый полный перебор"""
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if use_scan:
+            scan_apply_gravity(level, 1, 1)
+        else:
+            level.apply_gravity(1, 1)
+        finish_movements(level)
+    return (time.perf_counter() - start) / ticks
+
+
+def center_camera(level, view_width=800, view_height=600):
+    """Камера в центре карты"""
+    camera_x = max(0, (level.width * level.tile_size - view_width) // 2)
+    camera_y = max(0, (level.height * level.tile_size - view_height) // 2)
+    return camera_x, camera_y
+
+
+def repeats_for(object_count, repeats):
+    """Меньше повторов для самых тяжелых карт"""
+    return max(3, repeats // (1 + object_count // 10000))
+
+
+def bench_physics(results, map_cases, warmup, repeats):
+    """Загрузка карты LevelData, apply_gravity (все объекты проснулись / улеглись) и Level.update"""
+    for width, height, object_count in map_cases:
+        name = f"{width}x{height}/{object_count}"
+        level = make_level(None, object_count, width=width, height=height)
+        heavy_repeats = repeats_for(object_count, repeats)
+
+        level_data = make_level_data(level)
+        results[f"level_load/{name}"] = measure(
+            lambda: LevelState(None, 1, level_data=level_data), warmup=1, repeats=heavy_repeats)
+
+        results[f"gravity_awake/{name}"] = measure(
+            lambda: level.apply_gravity(1, 1), setup=lambda: wake_all(level),
+            warmup=1, repeats=heavy_repeats)
+
+        settle(level)
+        results[f"gravity_settled/{name}"] = measure(
+            lambda: level.apply_gravity(1, 1), warmup=warmup, repeats=repeats)
+
+        results[f"level_update/{name}"] = measure(
+            lambda: level.update(1 / 60, 1, 1), warmup=warmup, repeats=heavy_repeats)
+        print(f"  physics {name}")
+
+
+def bench_chunked(results, warmup, repeats):
+    """Level.update на карте 10000x10000 из чанков, пока игрок идет по диагонали"""
+    level = LevelState(None, 1, width=10000, height=10000, chunk_size=32, seed=1)
+    player_tile = [1]
+
+    def walk():
+        player_tile[0] += 1
+        level.update(1 / 60, player_tile[0], player_tile[0] // 2)
+
+    results["chunked_update/10000x10000"] = measure(walk, warmup=warmup, repeats=repeats * 10)
+
+
+def bench_rendering(results, sprite_loader, map_cases, warmup, repeats):
+    """Level.render и GameScreen.render на экране 800x600"""
+    from game_screen import GameScreen
+    from game_settings import GameSettings
+
+    screen = pygame.Surface((800, 600))
+    for width, height, object_count in map_cases:
+        name = f"{width}x{height}/{object_count}"
+        level = make_level(sprite_loader, object_count, width=width, height=height)
+        camera_x, camera_y = center_camera(level)
+        results[f"level_render/{name}"] = measure(
+            lambda: level.render(screen, camera_x, camera_y), warmup=warmup, repeats=repeats)
+        print(f"  render {name}")
+
+    game_screen = GameScreen(800, 600, sprite_loader, GameSettings())
+    results["game_screen_render"] = measure(
+        lambda: game_screen.render(screen), warmup=warmup, repeats=repeats)
+
+
+def bench_startup(results, warmup, repeats):
+    """Создание SpriteLoader, Game.__init__ до первого кадра меню и уровня генератора"""
+    from game import Game
+
+    screen = pygame.display.get_surface()
+    startup_repeats = max(3, repeats // 4)
+    results["startup/sprite_loader"] = measure(
+        SpriteLoader, warmup=min(warmup, 1), repeats=startup_repeats)
+    results["startup/game_init"] = measure(
+        lambda: Game(screen, 800, 600).shutdown(), warmup=min(warmup, 1), repeats=startup_repeats)
+
+    def first_menu_frame():
+        game = Game(screen, 800, 600)
+        # Экран загрузки показывается, пока спрайты декодируются в фоне
+        while game.current_screen != 'MENU':
+            game.update(1.0 / 60)
+            game.render()
+            pygame.display.flip()
+        game.render()
+        pygame.display.flip()
+        game.shutdown()
+    results["startup/first_menu_frame"] = measure(
+        first_menu_frame, warmup=min(warmup, 1), repeats=startup_repeats)
+
+    # Уровень LevelManager: генерация и повторный запуск из кэша на диске
+    cache_path = tempfile.mkdtemp(prefix="level_cache_")
+    try:
+        results["startup/level_generate"] = measure(
+            lambda: generate_level(12345, 100, 100, difficulty=5), warmup=warmup, repeats=repeats)
+        get_cached_level(12345, 100, 100, 5, cache_path)
+        results["startup/level_cached"] = measure(
+            lambda: get_cached_level(12345, 100, 100, 5, cache_path), warmup=warmup, repeats=repeats)
+    finally:
+        shutil.rmtree(cache_path, ignore_errors=True)
+
+
+def bench_replays(results, paths, warmup, repeats):
+    """Полное воспроизведение записанных сессий без отрисовки"""
+    from replay import Recording, replay
+
+    for path in paths:
+        recording = Recording.load(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        results[f"replay/{name}"] = measure(lambda: replay(recording), warmup=min(warmup, 1),
+                                            repeats=max(3, repeats // 4))
+
+
+def run_suite(output, quick=False, warmup=3, repeats=20, groups=None, replays=()):
+    """Прогон набора замеров с сохранением результатов в JSON"""
+    init_display()
+    map_cases = QUICK_MAP_CASES if quick else MAP_CASES
+    groups = groups or GROUPS
+
+    results = {}
+    if 'physics' in groups:
+        print("physics...")
+        bench_physics(results, map_cases, warmup, repeats)
+        bench_chunked(results, warmup, repeats)
+    if 'render' in groups:
+        print("render...")
+        bench_rendering(results, SpriteLoader(), map_cases, warmup, repeats)
+    if 'startup' in groups:
+        print("startup...")
+        bench_startup(results, warmup, repeats)
+    if replays:
+        print("replays...")
+        bench_replays(results, replays, warmup, repeats)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'quick': quick,
+            'warmup': warmup,
+            'repeats': repeats,
+        },
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    print_results(results)
+    print(f"Результаты сохранены в {output}")
+    return report
+
+
+def print_results(results):
+    """Таблица результатов"""
+    print(f"{'case':<36} {'p50, ms':>10} {'p90, ms':>10} {'p99, ms':>10}")
+    for name, stats in sorted(results.items()):
+        print(f"{name:<36} {stats['p50']:>10.3f} {stats['p90']:>10.3f} {stats['p99']:>10.3f}")
+
+
+def compare(baseline_path, current_path, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA):
+    """Сравнение двух прогонов по p50, возвращает список замедлившихся замеров"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    with open(current_path) as f:
+        current = json.load(f)['results']
+
+    regressions = []
+    print(f"{'case':<36} {'base p50':>10} {'new p50':>10} {'change':>8}")
+    for name in sorted(set(baseline) & set(current)):
+        base = baseline[name]['p50']
+        new = current[name]['p50']
+        change = (new - base) / base if base > 0 else 0.0
+        status = ''
+        if change > threshold and new - base > min_delta:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif change < -threshold and base - new > min_delta:
+            status = 'faster'
+        print(f"{name:<36} {base:>10.3f} {new:>10.3f} {change:>+8.1%} {status}")
+
+    for name in sorted(set(baseline) - set(current)):
+        print(f"{name:<36} нет в новом прогоне")
+    return regressions
+
+
+def report_gravity(object_counts=(10, 50, 100, 200, 400, 800), ticks=5):
+    """Сравнение тика гравитации: старый полный перебор против индекса занятости и очереди пробуждения"""
+    sprite_loader = SpriteLoader()
+    print(f"{'objects':>8} {'scan, ms':>10} {'index, ms':>10} {'speedup':>8}")
+    for count in object_counts:
+        scan = time_gravity(make_level(sprite_loader, count), ticks, use_scan=True)
+        index = time_gravity(make_level(sprite_loader, count), ticks, use_scan=False)
+        print(f"{count:>8} {scan * 1000:>10.3f} {index * 1000:>10.3f} {scan / index:>7.1f}x")
+
+
+def report_settled(object_counts=(1000, 5000, 20000), ticks=20):
+    """Стоимость тика гравитации после того, как все объекты улеглись"""
+    sprite_loader = SpriteLoader()
+    print(f"{'objects':>8} {'settle ticks':>13} {'settled tick, ms':>17}")
+    for count in object_counts:
+        level = make_level(sprite_loader, count)
+        settle_ticks = settle(level)
+        elapsed = time_gravity(level, ticks, use_scan=False)
+        print(f"{count:>8} {settle_ticks:>13} {elapsed * 1000:>17.4f}")
+
+
+def report_blits(sizes=((15, 12), (30, 20), (100, 100)), frames=5):
+    """Количество blit-ов за кадр: по тайлу на клетку против кэша чанков"""
+    sprite_loader = SpriteLoader()
+    screen = pygame.Surface((800, 600))
+    print(f"{'map':>9} {'all tiles':>10} {'visible':>8} {'cached':>7}")
+    for width, height in sizes:
+        level = Level(sprite_loader, None, 1, width=width, height=height, seed=1)
+        camera_x, camera_y = center_camera(level)
+        for _ in range(frames):
+            level.render(screen, camera_x, camera_y)
+        x0, y0, x1, y1 = level.get_visible_tile_range(camera_x, camera_y, 800, 600)
+        objects = level.last_render_blits - level.terrain.render(screen, camera_x, camera_y)
+        all_tiles = width * height + len([obj for obj in level.game_objects if obj.active])
+        visible = (x1 - x0) * (y1 - y0) + objects
+        print(f"{width:>4}x{height:<4} {all_tiles:>10} {visible:>8} {level.last_render_blits:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности Earth Shaker")
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help="прогнать замеры и сохранить JSON")
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--quick', action='store_true', help="только карты до 100x100")
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--repeats', type=int, default=20)
+    run_parser.add_argument('--only', nargs='+', choices=GROUPS)
+    run_parser.add_argument('--replay', nargs='+', default=[], help="записи сессий для замера (replay.py)")
+
+    compare_parser = commands.add_parser('compare', help="сравнить прогон с базовым")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="допустимое замедление p50, доля (по умолчанию 0.15)")
+    compare_parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                                help="минимальная значимая разница p50, мс")
+
+    commands.add_parser('report', help="таблицы сравнения старых и новых алгоритмов")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_suite(args.output, args.quick, args.warmup, args.repeats, args.only, args.replay)
+    elif args.command == 'compare':
+        regressions = compare(args.baseline, args.current, args.threshold, args.min_delta)
+        if regressions:
+            print(f"Регрессий: {len(regressions)}")
+            sys.exit(1)
+    else:
+        init_display()
+        report_gravity()
+        report_settled()
+        report_blits()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import zlib
+
+from object_store import NO_OBJECT
+
+
+class ChunkedTileGrid:
+    """Карта тайлов по чанкам: чанк создается при первом обращении, неиспользуемые выгружаются
+
+    Интерфейс совпадает с TileGrid (get, set, in_bounds), поэтому уровень работает
+    с обеими картами одинаково. Выгруженный чанк без изменений просто забывается и
+    при следующем обращении генерируется заново, измененный хранится сжатым.
+    """
+
+    def __init__(self, width, height, generate_chunk, chunk_size=32, on_chunk_loaded=None):
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunks_across = (width + chunk_size - 1) // chunk_size
+        self.chunks_down = (height + chunk_size - 1) // chunk_size
+        # generate_chunk(chunk_x, chunk_y) -> bytearray chunk_size*chunk_size (детерминированно)
+        self.generate_chunk = generate_chunk
+        # on_chunk_loaded(chunk_x, chunk_y, first_time) - вызывается после загрузки чанка
+        self.on_chunk_loaded = on_chunk_loaded
+
+        self.chunks = {}       # (chunk_x, chunk_y) -> bytearray загруженного чанка
+        self.compressed = {}   # (chunk_x, chunk_y) -> zlib выгруженного измененного чанка
+        self.modified = set()  # загруженные чанки, отличающиеся от сгенерированных
+        self.generated = bytearray(self.chunks_across * self.chunks_down)  # 1 - чанк уже создавался
+
+    def in_bounds(self, x, y):
+        """Проверка, находится ли клетка внутри карты"""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_loaded(self, x, y):
+        """Загружен ли чанк с этой клеткой (без загрузки)"""
+        return (x // self.chunk_size, y // self.chunk_size) in self.chunks
+
+    def get(self, x, y):
+        """Код тайла в клетке (загружает чанк при необходимости, без проверки границ)"""
+        chunk_x, local_x = divmod(x, self.chunk_size)
+        chunk_y, local_y = divmod(y, self.chunk_size)
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.load_chunk(chunk_x, chunk_y)
+        return chunk[local_y * self.chunk_size + local_x]
+
+    def set(self, x, y, code):
+        """Установка кода тайла в клетке (загружает чанк при необходимости, без проверки границ)"""
+        chunk_x, local_x = divmod(x, self.chunk_size)
+        chunk_y, local_y = divmod(y, self.chunk_size)
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.load_chunk(chunk_x, chunk_y)
+        chunk[local_y * self.chunk_size + local_x] = code
+        self.modified.add((chunk_x, chunk_y))
+
+    def get_chunk_key(self, x, y):
+        """Чанк, в котором лежит клетка"""
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def load_chunk(self, chunk_x, chunk_y):
+        """Загрузка чанка: распаковка сохраненного или генерация"""
+        key = (chunk_x, chunk_y)
+        packed = self.compressed.pop(key, None)
+        if packed is not None:
+            chunk = bytearray(zlib.decompress(packed))
+            self.modified.add(key)
+        else:
+            chunk = self.generate_chunk(chunk_x, chunk_y)
+        self.chunks[key] = chunk
+
+        flag_index = chunk_y * self.chunks_across + chunk_x
+        first_time = not self.generated[flag_index]
+        self.generated[flag_index] = 1
+        if self.on_chunk_loaded:
+            self.on_chunk_loaded(chunk_x, chunk_y, first_time)
+        return chunk
+
+    def unload_chunk(self, chunk_x, chunk_y):
+        """Выгрузка чанка (измененный сохраняется сжатым)"""
+        key = (chunk_x, chunk_y)
+        chunk = self.chunks.pop(key, None)
+        if chunk is not None and key in self.modified:
+            self.modified.discard(key)
+            self.compressed[key] = zlib.compress(bytes(chunk))
+
+    def get_loaded_chunks(self):
+        """Ключи загруженных чанков"""
+        return list(self.chunks)
+
+
+class ObjectIndex(dict):
+    """Разреженный индекс занятости для больших карт: хранит только занятые клетки"""
+
+    def __missing__(self, index):
+        return NO_OBJECT
+
+    def __setitem__(self, index, object_id):
+        if object_id == NO_OBJECT:
+            self.pop(index, None)
+        else:
+            super().__setitem__(index, object_id)
@@ -4,6 +4,10 @@ SCREEN_HEIGHT = 600
 FPS = 60
 TILE_SIZE = 64
 
+# Симуляция идет фиксированными шагами независимо от частоты кадров
+SIMULATION_RATE = 60  # шагов в секунду
+MAX_SIMULATION_STEPS = 5  # максимум шагов за кадр (остальное отбрасывается)
+
 # Цвета
 COLORS = {
     'BLACK': (0, 0, 0),
@@ -24,6 +28,35 @@ SMOOTH_MOVEMENT = True  # Плавное движение включено по
 ANIMATION_SPEED = 0.25
 MOVEMENT_DURATION = 0.2
 
+# Отладка
+DEBUG_CHECKS = False  # Сверять счетчики и индексы уровня с полным перебором и кадр dirty rects с полной отрисовкой
+
+# Печатать время инициализации подсистем и до первого кадра меню
+STARTUP_REPORT = False
+
+# Замеры кадров профилировщика (F3 в игре, F4 - экспорт в CSV)
+PROFILES_PATH = "profiles"
+
+# Звук: настройки микшера из sound_manager.AUDIO_PRESETS -
+# 'default', 'low_latency' (игровые автоматы) или 'low_cpu' (киоски)
+AUDIO_PRESET = "default"
+# Печатать при выходе задержку от нажатия клавиши движения до звука шага или копания
+AUDIO_LATENCY_REPORT = False
+# Фоновая музыка в assets (во время игры читается с диска по частям)
+MUSIC_FILE = "play_music.wav"
+
+# Запись сессий для воспроизведения (python replay.py файл.json)
+RECORD_REPLAYS = False
+REPLAYS_PATH = "replays"
+
+# Кэш сгенерированных уровней (ключ - seed, сложность, размер и версия генератора)
+LEVEL_CACHE_PATH = "cache/levels"
+# Обработанный атлас спрайтов (пересобирается, если изменился art.png)
+SPRITE_CACHE_PATH = "cache/sprites.atlas"
+
+# Отрисовка
+DIRTY_RECTS = False  # Обновлять на экране только изменившиеся области
+
 # Пути к ресурсам
 ASSETS_PATH = "assets"
 SPRITES_FILE = "art.png"
\ No newline at end of file
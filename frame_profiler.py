@@ -0,0 +1,138 @@
+import csv
+import os
+import time
+from collections import deque
+
+# Фазы кадра в порядке вывода: имя -> подпись в оверлее
+PHASES = (
+    ('input', 'input'),
+    ('player.update', 'Player.update'),
+    ('level.update', 'Level.update'),
+    ('level.animation', '  animation'),
+    ('level.gravity', '  apply_gravity'),
+    ('level.render', 'Level.render'),
+    ('player.render', 'Player.render'),
+    ('render_ui', 'render_ui'),
+)
+PHASE_NAMES = tuple(name for name, _ in PHASES)
+# Счетчики кадра: активные объекты, объекты на проверке гравитации, blit-ы уровня и игрока
+COUNTERS = ('objects', 'awake', 'blits')
+
+
+def percentile(samples, fraction):
+    """Перцентиль отсортированной выборки с линейной интерполяцией"""
+    if not samples:
+        return 0.0
+    position = (len(samples) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(samples) - 1)
+    return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+
+class FrameProfiler:
+    """Замер времени фаз кадра без изменения замеряемого кода
+
+    watch подменяет метод объекта (атрибутом экземпляра) оберткой с замером,
+    unwatch_all возвращает исходные методы, поэтому выключенный профилировщик
+    ничего не стоит. Время фазы суммируется за кадр: за один кадр может пройти
+    несколько шагов симуляции.
+    """
+
+    def __init__(self, history=240):
+        self.enabled = False
+        # Последние кадры для оверлея и все кадры сессии для экспорта в CSV
+        self.history = deque(maxlen=history)
+        self.samples = []
+        # Подмененные методы: (объект, имя метода, обертка, прежний атрибут экземпляра или None)
+        self.watched = []
+        self.current = dict.fromkeys(PHASE_NAMES, 0.0)
+        self.frame_start = None
+        self.session_start = time.perf_counter()
+
+    def watch(self, obj, method_name, phase):
+        """Замер вызовов obj.method_name в фазе phase (повторный вызов ничего не делает)"""
+        wrapped = vars(obj).get(method_name)
+        if any(wrapper is wrapped for _, _, wrapper, _ in self.watched):
+            return
+        # Обертку другого профилировщика (например, экрана прошлого уровня) заменяем,
+        # а обертку трассировки (FrameTracer) оставляем внутри новой
+        if hasattr(wrapped, 'profiled_method'):
+            method, previous = wrapped.profiled_method, wrapped.profiled_previous
+        else:
+            method, previous = getattr(obj, method_name), wrapped
+        current = self.current
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                current[phase] += (time.perf_counter() - start) * 1000
+
+        timed.profiled_method = method
+        timed.profiled_previous = previous
+        setattr(obj, method_name, timed)
+        self.watched.append((obj, method_name, timed, previous))
+
+    def unwatch_all(self):
+        """Возврат методов, которые были до замера"""
+        for obj, method_name, wrapper, previous in self.watched:
+            if vars(obj).get(method_name) is not wrapper:
+                continue
+            if previous is None:
+                del vars(obj)[method_name]
+            else:
+                setattr(obj, method_name, previous)
+        self.watched = []
+
+    def set_enabled(self, enabled):
+        """Включение и выключение замеров (кадр при включении начинается заново)"""
+        self.enabled = enabled
+        self.frame_start = None
+        if not enabled:
+            self.unwatch_all()
+
+    def end_frame(self, counts=(0, 0, 0)):
+        """Завершение кадра: время с прошлого кадра, фазы за кадр и счетчики COUNTERS"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            sample = (len(self.samples), (now - self.session_start) * 1000, (now - self.frame_start) * 1000,
+                      tuple(self.current[name] for name in PHASE_NAMES), tuple(counts))
+            self.history.append(sample)
+            self.samples.append(sample)
+        self.frame_start = now
+        for name in PHASE_NAMES:
+            self.current[name] = 0.0
+
+    def get_frame_times(self):
+        """Время последних кадров в мс (для графика)"""
+        return [sample[2] for sample in self.history]
+
+    def get_last_counts(self):
+        """Счетчики последнего кадра: {имя: значение}"""
+        if not self.history:
+            return dict.fromkeys(COUNTERS, 0)
+        return dict(zip(COUNTERS, self.history[-1][4]))
+
+    def get_stats(self):
+        """Статистика последних кадров: [(фаза, последнее, p50, p95, p99)], начиная с кадра целиком"""
+        stats = []
+        columns = [('frame', [sample[2] for sample in self.history])]
+        columns += [(name, [sample[3][index] for sample in self.history]) for index, name in enumerate(PHASE_NAMES)]
+        for name, values in columns:
+            last = values[-1] if values else 0.0
+            values = sorted(values)
+            stats.append((name, last, percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)))
+        return stats
+
+    def export_csv(self, path):
+        """Запись всех кадров сессии в CSV (одна строка на кадр), возвращает количество строк"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'time_ms', 'frame_ms'] + [f"{name}_ms" for name in PHASE_NAMES] +
+                            list(COUNTERS))
+            for frame, time_ms, frame_ms, phases, counts in self.samples:
+                writer.writerow([frame, f"{time_ms:.3f}", f"{frame_ms:.3f}"] +
+                                [f"{value:.3f}" for value in phases] + list(counts))
+        return len(self.samples)
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Сколько последних интервалов хранить: при долгой сессии в файл попадает ее конец
+DEFAULT_MAX_EVENTS = 500000
+
+
+class FrameTracer:
+    """Запись интервалов выполнения методов в формате Chrome trace events
+
+    trace подменяет метод объекта (атрибутом экземпляра) оберткой, которая
+    запоминает начало и длительность вызова. Без трассировки объекты не
+    оборачиваются и ничего не замедляется. Файл открывается в chrome://tracing
+    или https://ui.perfetto.dev.
+    """
+
+    def __init__(self, path, max_events=DEFAULT_MAX_EVENTS):
+        self.path = path
+        # Интервалы: (имя, начало в мкс, длительность в мкс, поток, аргументы или None)
+        self.events = deque(maxlen=max_events)
+        self.thread_names = {}
+        # После stop интервалы больше не записываются (обертки остаются)
+        self.recording = True
+        self.frame_start = None
+        self.frame_count = 0
+
+    def get_time_us(self):
+        """Текущее время в микросекундах"""
+        return time.perf_counter_ns() // 1000
+
+    def add_span(self, name, start, end, args=None):
+        """Добавление интервала выполнения (время в мкс)"""
+        if not self.recording:
+            return
+        thread = threading.get_ident()
+        if thread not in self.thread_names:
+            self.thread_names[thread] = threading.current_thread().name
+        self.events.append((name, start, end - start, thread, args))
+
+    def trace(self, obj, method_name, name=None):
+        """Запись каждого вызова obj.method_name интервалом name"""
+        method = getattr(obj, method_name)
+        name = name or f"{type(obj).__name__}.{method_name}"
+        add_span = self.add_span
+        clock = time.perf_counter_ns
+
+        def traced(*args, **kwargs):
+            start = clock() // 1000
+            try:
+                return method(*args, **kwargs)
+            finally:
+                add_span(name, start, clock() // 1000)
+
+        setattr(obj, method_name, traced)
+
+    def trace_game(self, game):
+        """Интервалы главного цикла: обработка событий, шаг и отрисовка игры"""
+        for method_name in ('handle_event', 'update', 'render', 'handle_screen_result', 'create_game_screen'):
+            self.trace(game, method_name, f"Game.{method_name}")
+        self.trace(game.asset_loader, 'process_finished')
+        self.trace(game.sound_manager, 'update', 'SoundManager.update')
+
+    def trace_game_screen(self, screen):
+        """Интервалы основных шагов экрана игры (вызывается для каждого нового экрана)"""
+        for method_name in ('update', 'render', 'render_dirty', 'render_ui', 'update_camera'):
+            self.trace(screen, method_name, f"GameScreen.{method_name}")
+        self.trace(screen.simulation, 'update', 'Simulation.update')
+        self.trace(screen.player, 'update', 'Player.update')
+        self.trace(screen.player, 'render', 'Player.render')
+        for method_name in ('update', 'update_animations', 'apply_gravity', 'update_chunks', 'render'):
+            self.trace(screen.level, method_name, f"Level.{method_name}")
+        self.trace(screen.level.terrain, 'render', 'TerrainCache.render')
+
+    def begin_frame(self):
+        """Начало кадра главного цикла"""
+        self.frame_start = self.get_time_us()
+
+    def end_frame(self):
+        """Конец кадра: интервал 'frame' охватывает все вызовы кадра"""
+        if self.frame_start is not None:
+            self.add_span('frame', self.frame_start, self.get_time_us(), {'frame': self.frame_count})
+            self.frame_start = None
+        self.frame_count += 1
+
+    def stop(self):
+        """Остановка записи"""
+        self.recording = False
+
+    def save(self):
+        """Запись трассы в JSON (формат Chrome trace events), возвращает количество интервалов"""
+        pid = os.getpid()
+        trace_events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread, 'args': {'name': name}}
+                        for thread, name in self.thread_names.items()]
+        for name, start, duration, thread, args in self.events:
+            event = {'name': name, 'cat': name.split('.')[0], 'ph': 'X',
+                     'ts': start, 'dur': duration, 'pid': pid, 'tid': thread}
+            if args:
+                event['args'] = args
+            trace_events.append(event)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+        return len(self.events)
@@ -1,7 +1,12 @@
+import time
 import pygame
+import config
+from asset_loader import AssetLoader
+from loading_screen import LoadingScreen
 from menu_screen import MenuScreen
 from level_select_screen import LevelSelectScreen
 from game_screen import GameScreen
+from level_data import LevelData
 from settings_screen import SettingsScreen
 from sprite_loader import SpriteLoader
 from sound_manager import SoundManager
@@ -14,70 +19,124 @@ class Game:
         self.width = width
         self.height = height
         
-        # Инициализация подсистем
-        pygame.mixer.init()
+        # Время инициализации подсистем: [(подсистема, мс)] для отчета о запуске
+        self.startup_timings = []
         
         # Настройки игры
-        self.game_settings = GameSettings()
+        self.game_settings = self.time_startup('game_settings', GameSettings)
         
-        # Загрузчики ресурсов
-        self.sprite_loader = SpriteLoader()
-        self.sound_manager = SoundManager()
+        # Загрузчики ресурсов: декодирование в потоках AssetLoader, пока виден экран загрузки;
+        # микшер и звуки загружаются в фоне, когда меню уже показано
+        self.asset_loader = self.time_startup('asset_loader', AssetLoader)
+        self.sprite_loader = self.time_startup('sprite_loader', SpriteLoader, self.asset_loader)
+        self.sound_manager = self.time_startup('sound_manager', SoundManager, self.asset_loader)
         
         # Обработчик ввода
-        self.input_handler = InputHandler()
+        self.input_handler = self.time_startup('input_handler', InputHandler)
         
-        # Экраны игры
-        self.screens = {
-            'MENU': MenuScreen(width, height),
-            'LEVEL_SELECT': LevelSelectScreen(width, height),
-            'GAME': GameScreen(width, height, self.sprite_loader, self.game_settings),
-            'SETTINGS': SettingsScreen(width, height, self.sound_manager, self.game_settings)
-        }
+        # Экраны игры создаются при первом переходе на них; экран игры - при выборе уровня
+        self.screens = {}
         
         # Текущий экран
-        self.current_screen = 'MENU'
+        self.current_screen = 'LOADING'
+        self.time_startup('loading_screen', self.get_screen, 'LOADING')
+        # Экран, отрисованный в прошлом кадре (для режима dirty rects)
+        self.last_rendered_screen = None
+        
+        # Трассировка главного цикла (main.py --trace): новые экраны игры тоже трассируются
+        self.tracer = None
         
         print("Игра инициализирована")
     
+    def time_startup(self, name, factory, *args):
+        """Создание подсистемы с замером времени для отчета о запуске"""
+        start = time.perf_counter()
+        result = factory(*args)
+        self.startup_timings.append((name, (time.perf_counter() - start) * 1000))
+        return result
+    
+    def get_startup_report(self, first_frame_ms=None):
+        """Отчет о запуске: время каждой подсистемы и до первого кадра меню"""
+        lines = [f"{name:<18}{ms:8.1f} мс" for name, ms in self.startup_timings]
+        lines.append(f"{'Game.__init__':<18}{sum(ms for _, ms in self.startup_timings):8.1f} мс")
+        lines += [f"  {name:<16}{ms:8.1f} мс (в фоне)" for name, ms in self.asset_loader.timings]
+        if first_frame_ms is not None:
+            lines.append(f"{'первый кадр меню':<18}{first_frame_ms:8.1f} мс")
+        return "\n".join(lines)
+    
+    def get_screen(self, name):
+        """Экран по имени (создается при первом обращении)"""
+        screen = self.screens.get(name)
+        if screen is None:
+            if name == 'LOADING':
+                screen = LoadingScreen(self.width, self.height, self.asset_loader)
+            elif name == 'MENU':
+                screen = MenuScreen(self.width, self.height)
+            elif name == 'LEVEL_SELECT':
+                screen = LevelSelectScreen(self.width, self.height)
+            elif name == 'SETTINGS':
+                screen = SettingsScreen(self.width, self.height, self.sound_manager, self.game_settings)
+            else:
+                raise KeyError(f"Экран {name} не создан")
+            self.screens[name] = screen
+        return screen
+    
     def handle_event(self, event):
         """Обработка событий"""
         # Передаем события в обработчик ввода
         self.input_handler.handle_event(event)
+        if (event.type == pygame.KEYDOWN and
+                self.input_handler.key_mapping.get(event.key) in ('UP', 'DOWN', 'LEFT', 'RIGHT')):
+            # Время события от SDL, если pygame его передает; иначе - момент обработки
+            self.sound_manager.mark_input(getattr(event, 'timestamp', None))
         
         # Передаем события в текущий экран
-        current_screen_obj = self.screens[self.current_screen]
+        current_screen_obj = self.get_screen(self.current_screen)
         result = current_screen_obj.handle_event(event)
         
         # Обрабатываем результат
         if result:
+            # Звук выбора пункта меню
+            self.sound_manager.play_sound('select')
             return self.handle_screen_result(result)
         
         return None
     
+    def create_game_screen(self, level_number):
+        """Новый экран игры (спрайты должны быть загружены)"""
+        self.asset_loader.wait_required()
+        self.screens['GAME'] = GameScreen(self.width, self.height, self.sprite_loader, self.game_settings,
+                                         level_number=level_number, sound_manager=self.sound_manager)
+        if self.tracer is not None:
+            self.tracer.trace_game_screen(self.screens['GAME'])
+    
     def handle_screen_result(self, result):
         """Обработка результатов экранов"""
-        if result == "START_GAME":
+        if result == "LOADING_DONE":
+            self.current_screen = 'MENU'
+            # Меню уже можно показывать; звуки догружаются в фоне
+            self.sound_manager.init_audio()
+        elif result == "START_GAME":
             self.current_screen = 'GAME'
             # Создаем новый экран игры с уровнем 1
-            self.screens['GAME'] = GameScreen(self.width, self.height, self.sprite_loader, self.game_settings, level_number=1)
-            self.sound_manager.play_music("game_music.ogg")
+            self.create_game_screen(1)
+            self.sound_manager.play_music(config.MUSIC_FILE)
         elif result == "SELECT_LEVEL":
             self.current_screen = 'LEVEL_SELECT'
         elif result.startswith("START_LEVEL_"):
             level_number = int(result.split("_")[-1])
             self.current_screen = 'GAME'
             # Создаем новый экран игры с выбранным уровнем
-            self.screens['GAME'] = GameScreen(self.width, self.height, self.sprite_loader, self.game_settings, level_number=level_number)
-            self.sound_manager.play_music("game_music.ogg")
+            self.create_game_screen(level_number)
+            self.sound_manager.play_music(config.MUSIC_FILE)
         elif result == "LEVEL_COMPLETE":
             # Переходим к следующему уровню или показываем экран победы
             current_level = getattr(self.screens['GAME'], 'level_number', 1)
             next_level = current_level + 1
             
-            if next_level <= 4:  # Максимум 4 уровня
+            if next_level <= LevelData.get_level_count():
                 print(f"Moving to level {next_level}")
-                self.screens['GAME'] = GameScreen(self.width, self.height, self.sprite_loader, self.game_settings, level_number=next_level)
+                self.create_game_screen(next_level)
             else:
                 print("Game completed!")
                 self.current_screen = 'MENU'
@@ -95,23 +154,49 @@ class Game:
         
         return None
     
+    def shutdown(self):
+        """Завершение игры: сохраняем незаконченную запись сессии и останавливаем загрузку"""
+        game_screen = self.screens.get('GAME')
+        if game_screen is not None:
+            game_screen.save_recording()
+        self.asset_loader.shutdown()
+    
     def update(self, dt):
         """Обновление игры"""
-        current_screen_obj = self.screens[self.current_screen]
+        # Загруженные в фоне ресурсы передаются игре в главном потоке
+        self.asset_loader.process_finished()
+        
+        current_screen_obj = self.get_screen(self.current_screen)
         
         # Получаем результат обновления экрана
         if hasattr(current_screen_obj, 'update'):
             result = current_screen_obj.update(dt, self.input_handler)
-            
-            # Обрабатываем результат
-            if result:
-                return self.handle_screen_result(result)
         else:
+            result = None
             current_screen_obj.update(dt, self.input_handler)
         
+        # Звуки, запрошенные за шаг, запускаются один раз
+        self.sound_manager.update()
+        
+        # Обрабатываем результат
+        if result:
+            return self.handle_screen_result(result)
         return None
     
-    def render(self):
-        """Отрисовка игры"""
-        current_screen_obj = self.screens[self.current_screen]
-        current_screen_obj.render(self.screen)
+    def render(self, alpha=1.0):
+        """Отрисовка игры с интерполяцией alpha между шагами симуляции (возвращает изменившиеся области или None)"""
+        current_screen_obj = self.get_screen(self.current_screen)
+        if hasattr(current_screen_obj, 'interpolation'):
+            current_screen_obj.interpolation = alpha
+        
+        if not self.game_settings.dirty_rects or not hasattr(current_screen_obj, 'render_dirty'):
+            current_screen_obj.render(self.screen)
+            self.last_rendered_screen = None
+            return None
+        
+        # При смене экрана старое изображение недействительно
+        if current_screen_obj is not self.last_rendered_screen:
+            current_screen_obj.invalidate()
+            self.last_rendered_screen = current_screen_obj
+        
+        return current_screen_obj.render_dirty(self.screen)
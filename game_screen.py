@@ -1,56 +1,150 @@
+import math
+import os
+import time
 import pygame
+import config
 from player import Player
 from level import Level
+from level_data import LevelData
+from level_manager import LevelManager
+from frame_profiler import FrameProfiler
+from profiler_overlay import ProfilerOverlay
+from replay import Recording
+from simulation import Simulation
 
 class GameScreen:
-    def __init__(self, width, height, sprite_loader, game_settings, level_number=1):
+    def __init__(self, width, height, sprite_loader, game_settings, level_number=1, sound_manager=None):
         self.width = width
         self.height = height
         self.sprite_loader = sprite_loader
+        self.sound_manager = sound_manager
         self.game_settings = game_settings
         self.level_number = level_number
         
-        # Создаем уровень и игрока
-        self.level = Level(sprite_loader, game_settings, level_number)
+        # Создаем уровень (карта из LevelData, если она есть, иначе случайная из LevelManager) и игрока
+        level_data = LevelData.get_level(level_number)
+        if level_data is not None:
+            self.level = Level(sprite_loader, game_settings, level_number, level_data=level_data)
+        else:
+            self.level = LevelManager(sprite_loader, game_settings).create_level(level_number)
         
         # Получаем стартовую позицию игрока из данных уровня
         player_start = self.level.get_player_start_position()
         self.player = Player(player_start[0] * 64, player_start[1] * 64, sprite_loader, game_settings)
         
+        # Игровая логика; уровень и игрок здесь только отрисовывают ее состояние
+        self.simulation = Simulation(self.level, self.player, game_settings)
+        
+        # Запись ввода для воспроизведения
+        self.recording = Recording.start(self.simulation) if config.RECORD_REPLAYS else None
+        
         # Камера
         self.camera_x = 0
         self.camera_y = 0
         
+        # Доля шага симуляции для интерполяции позиций при отрисовке (задается Game)
+        self.interpolation = 1.0
+        
         # Размер тайла
         self.tile_size = 64
         
         # UI
         self.font = pygame.font.Font(None, 24)
         self.font_large = pygame.font.Font(None, 36)
+        self.ui_height = 140
+        
+        # Кэш UI: полупрозрачная подложка и отрисованные строки текста
+        self.ui_background = pygame.Surface((self.width, self.ui_height))
+        self.ui_background.set_alpha(180)
+        self.ui_background.fill((0, 0, 0))
+        self.text_cache = {}  # ключ -> (текст, поверхность)
+        
+        # Состояние прошлого кадра для режима dirty rects
+        self.needs_full_redraw = True
+        self.last_camera = None
+        self.last_sprite_rects = {}
+        self.last_ui_state = None
+        self.max_dirty_rects = 64
+        
+        # Профилировщик кадра (F3 - оверлей, F4 - экспорт в CSV); оверлей создается при первом включении
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = None
         
     def handle_event(self, event):
         """Обработка событий экрана"""
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
+                self.save_recording()
+                self.set_profiler_enabled(False)
                 return "BACK_TO_MENU"
+            elif event.key == pygame.K_F3:
+                self.set_profiler_enabled(not self.profiler.enabled)
+            elif event.key == pygame.K_F4:
+                self.export_profile()
         return None
     
+    def set_profiler_enabled(self, enabled):
+        """Включение замера фаз кадра и оверлея"""
+        if enabled == self.profiler.enabled:
+            return
+        self.profiler.set_enabled(enabled)
+        if enabled:
+            self.profiler.watch(self.player, 'update', 'player.update')
+            self.profiler.watch(self.level, 'update', 'level.update')
+            self.profiler.watch(self.level, 'update_animations', 'level.animation')
+            self.profiler.watch(self.level, 'apply_gravity', 'level.gravity')
+            self.profiler.watch(self.level, 'render', 'level.render')
+            self.profiler.watch(self.player, 'render', 'player.render')
+            self.profiler.watch(self, 'render_ui', 'render_ui')
+            if self.profiler_overlay is None:
+                self.profiler_overlay = ProfilerOverlay(self.profiler)
+            self.profiler_overlay.invalidate()
+        # Оверлей появился или исчез - кадр перерисовывается целиком
+        self.invalidate()
+    
+    def export_profile(self):
+        """Запись замеров кадров сессии в CSV в папку профилей"""
+        if not self.profiler.samples:
+            print("Нет замеров: включите профилировщик (F3)")
+            return None
+        path = os.path.join(config.PROFILES_PATH,
+                            f"frames_level{self.level_number}_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+        count = self.profiler.export_csv(path)
+        print(f"Замеры кадров ({count}) сохранены: {path}")
+        return path
+    
+    def save_recording(self):
+        """Сохранение записи сессии (если она велась) в папку повторов"""
+        if self.recording is None or not self.recording.get_tick_count():
+            return None
+        self.recording.finish(self.simulation)
+        os.makedirs(config.REPLAYS_PATH, exist_ok=True)
+        path = os.path.join(config.REPLAYS_PATH,
+                            f"level{self.level_number}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        self.recording.save(path)
+        self.recording = None
+        print(f"Запись сохранена: {path}")
+        return path
+    
     def update(self, dt, input_handler):
         """Обновление игрового экрана"""
-        # Обновляем игрока
-        result = self.player.update(dt, input_handler, self.level)
+        if self.profiler.enabled and input_handler is not None:
+            self.profiler.watch(input_handler, 'handle_event', 'input')
+            self.profiler.watch(input_handler, 'update', 'input')
+        
+        # Шаг игровой логики (игрок, затем уровень)
+        result = self.simulation.update(dt, input_handler)
+        
+        # Звуки событий шага
+        if self.sound_manager is not None:
+            for event in self.level.events:
+                self.sound_manager.play_sound(event)
         
         # Проверяем завершение уровня
         if result == "LEVEL_COMPLETE":
+            self.save_recording()
             return "LEVEL_COMPLETE"
         
-        # Получаем позицию игрока в тайлах
-        player_tile_x = self.player.x // self.tile_size
-        player_tile_y = self.player.y // self.tile_size
-        
-        # Обновляем уровень с позицией игрока
-        self.level.update(dt, player_tile_x, player_tile_y)
-        
         # Обновляем камеру (следим за игроком)
         self.update_camera()
         
@@ -60,11 +154,12 @@ class GameScreen:
         
         return None
     
-    def update_camera(self):
+    def update_camera(self, alpha=1.0):
         """Обновление позиции камеры"""
         # Центрируем камеру на игроке
-        self.camera_x = self.player.x - self.width // 2
-        self.camera_y = self.player.y - self.height // 2
+        player_x, player_y = self.player.get_render_pos(alpha)
+        self.camera_x = player_x - self.width // 2
+        self.camera_y = player_y - self.height // 2
         
         # Ограничиваем камеру границами уровня
         max_camera_x = self.level.width * self.tile_size - self.width
@@ -77,52 +172,170 @@ class GameScreen:
         """Отрисовка игрового экрана"""
         # Заливаем фон
         screen.fill((0, 0, 0))
+        # Кадр рисуется целиком - изменившиеся клетки попадут в него
+        self.level.changed_tiles.clear()
+        
+        # Камера следует за интерполированной позицией игрока
+        self.update_camera(self.interpolation)
         
         # Отрисовываем уровень
-        self.level.render(screen, self.camera_x, self.camera_y)
+        self.level.render(screen, self.camera_x, self.camera_y, self.interpolation)
         
         # Отрисовываем игрока
-        self.player.render(screen, self.camera_x, self.camera_y)
+        self.player.render(screen, self.camera_x, self.camera_y, self.interpolation)
         
         # Отрисовываем UI
         self.render_ui(screen)
+        
+        if self.profiler.enabled:
+            self.render_profiler(screen)
     
-    def render_ui(self, screen):
-        """Отрисовка пользовательского интерфейса"""
-        # Полупрозрачный фон для UI
-        ui_height = 140
-        ui_surface = pygame.Surface((self.width, ui_height))
-        ui_surface.set_alpha(180)
-        ui_surface.fill((0, 0, 0))
-        screen.blit(ui_surface, (0, 0))
+    def render_profiler(self, screen):
+        """Завершение замера кадра и отрисовка оверлея профилировщика"""
+        level = self.level
+        self.profiler.end_frame((sum(level.active_counts.values()), len(level.awake_objects),
+                                 level.last_render_blits + 1))
+        self.profiler_overlay.render(screen)
+    
+    def invalidate(self):
+        """Следующий кадр в режиме dirty rects будет отрисован полностью"""
+        self.needs_full_redraw = True
+    
+    def get_sprite_rects(self):
+        """Экранные прямоугольники и кадры анимации всех видимых спрайтов"""
+        sprite_rects = {}
+        for obj in self.level.get_visible_objects(self.camera_x, self.camera_y, self.width, self.height):
+            obj_x, obj_y = obj.get_render_pos(self.interpolation)
+            rect = pygame.Rect(math.floor(obj_x - self.camera_x), math.floor(obj_y - self.camera_y),
+                               self.tile_size, self.tile_size)
+            sprite_rects[obj.id] = (rect, obj.animation_frame)
         
-        # Статистика игры
+        player_x, player_y = self.player.get_render_pos(self.interpolation)
+        player_rect = pygame.Rect(math.floor(player_x - self.camera_x), math.floor(player_y - self.camera_y),
+                                  self.tile_size, self.tile_size)
+        sprite_rects['player'] = (player_rect, self.player.animation_frame)
+        return sprite_rects
+    
+    def get_ui_state(self):
+        """Строки статистики UI (изменение требует перерисовки UI)"""
+        return tuple(self.get_stats_lines())
+    
+    def render_dirty(self, screen):
+        """Отрисовка только изменившихся областей, возвращает их список"""
+        screen_rect = screen.get_rect()
+        self.update_camera(self.interpolation)
+        camera = (self.camera_x, self.camera_y)
+        sprite_rects = self.get_sprite_rects()
+        ui_state = self.get_ui_state()
+        
+        # При прокрутке камеры и с оверлеем профилировщика меняется весь кадр
+        if self.needs_full_redraw or camera != self.last_camera or self.profiler.enabled:
+            self.render(screen)
+            self.needs_full_redraw = False
+            self.last_camera = camera
+            self.last_sprite_rects = sprite_rects
+            self.last_ui_state = ui_state
+            return [screen_rect]
+        
+        # Старые и новые места спрайтов, которые изменились
+        dirty = []
+        for key, state in sprite_rects.items():
+            previous = self.last_sprite_rects.get(key)
+            if previous != state:
+                dirty.append(state[0])
+                if previous:
+                    dirty.append(previous[0])
+        for key, previous in self.last_sprite_rects.items():
+            if key not in sprite_rects:
+                dirty.append(previous[0])
+        # Клетки карты, измененные с прошлого кадра (выкопанная земля и т.п.)
+        for tile_x, tile_y in self.level.changed_tiles:
+            dirty.append(pygame.Rect(math.floor(tile_x * self.tile_size - self.camera_x),
+                                     math.floor(tile_y * self.tile_size - self.camera_y),
+                                     self.tile_size, self.tile_size))
+        self.level.changed_tiles.clear()
+        
+        # UI полупрозрачный - перерисовываем его целиком вместе с уровнем под ним
+        ui_rect = pygame.Rect(0, 0, self.width, self.ui_height)
+        ui_dirty = ui_state != self.last_ui_state or any(rect.colliderect(ui_rect) for rect in dirty)
+        if ui_dirty:
+            dirty.append(ui_rect)
+        
+        self.last_sprite_rects = sprite_rects
+        self.last_ui_state = ui_state
+        
+        if len(dirty) > self.max_dirty_rects:
+            self.render(screen)
+            return [screen_rect]
+        
+        updated = []
+        for rect in dirty:
+            rect = rect.clip(screen_rect)
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            # Отрисовываем область в подповерхность со сдвигом камеры
+            area = screen.subsurface(rect)
+            area.fill((0, 0, 0))
+            self.level.render(area, self.camera_x + rect.x, self.camera_y + rect.y, self.interpolation)
+            self.player.render(area, self.camera_x + rect.x, self.camera_y + rect.y, self.interpolation)
+            updated.append(rect)
+        
+        if ui_dirty:
+            self.render_ui(screen)
+        
+        if config.DEBUG_CHECKS:
+            self.check_dirty_render(screen)
+        return updated
+    
+    def check_dirty_render(self, screen):
+        """Сверка кадра, собранного из dirty rects, с полной отрисовкой"""
+        reference = pygame.Surface(screen.get_size(), 0, screen)
+        self.render(reference)
+        if pygame.image.tostring(reference, "RGB") != pygame.image.tostring(screen, "RGB"):
+            raise RuntimeError("Dirty rects: кадр отличается от полной отрисовки")
+    
+    def get_stats_lines(self):
+        """Строки статистики игры для UI"""
         crystals_left = self.level.get_crystals_count()
         movement_mode = "Smooth" if self.game_settings.smooth_movement else "Grid"
-        stats = [
+        return [
             f"Level: {self.level_number}",
             f"Crystals: {self.player.crystals_collected}/{self.level.total_crystals}",
             f"Crystals left: {crystals_left}",
             f"Movement: {movement_mode}",
             f"Position: ({self.player.x // self.tile_size}, {self.player.y // self.tile_size})"
         ]
+    
+    def get_text_surface(self, key, text, font, color):
+        """Отрисованная строка текста; перерисовывается только при изменении текста"""
+        cached = self.text_cache.get(key)
+        if cached is None or cached[0] != text:
+            cached = (text, font.render(text, True, color))
+            self.text_cache[key] = cached
+        return cached[1]
+    
+    def render_ui(self, screen):
+        """Отрисовка пользовательского интерфейса"""
+        # Полупрозрачный фон для UI
+        screen.blit(self.ui_background, (0, 0))
         
-        for i, stat in enumerate(stats):
-            text_surface = self.font.render(stat, True, (255, 255, 255))
+        # Статистика игры
+        for i, stat in enumerate(self.get_stats_lines()):
+            text_surface = self.get_text_surface(('stat', i), stat, self.font, (255, 255, 255))
             screen.blit(text_surface, (10, 10 + i * 20))
         
         # Управление
         controls = [
             "WASD/Arrows - Move",
-            "ESC - Menu"
+            "ESC - Menu   F3 - Profiler"
         ]
         
         for i, control in enumerate(controls):
-            text_surface = self.font.render(control, True, (200, 200, 200))
+            text_surface = self.get_text_surface(('control', i), control, self.font, (200, 200, 200))
             screen.blit(text_surface, (10, 110 + i * 15))
         
         # Заголовок игры в правом верхнем углу
-        title = self.font_large.render("EARTHSHAKER", True, (255, 255, 0))
+        title = self.get_text_surface('title', "EARTHSHAKER", self.font_large, (255, 255, 0))
         title_rect = title.get_rect()
         title_rect.topright = (self.width - 10, 10)
         screen.blit(title, title_rect)
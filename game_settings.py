@@ -7,6 +7,7 @@ class GameSettings:
         self.smooth_movement = True
         self.sound_volume = 0.8
         self.music_volume = 0.7
+        self.dirty_rects = config.DIRTY_RECTS
         
     def toggle_smooth_movement(self):
         """Переключение плавного движения"""
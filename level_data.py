@@ -1,3 +1,9 @@
+import os
+import config
+from level_pack import LevelPack, pack_records, get_source_key
+from tile_grid import TileGrid
+
+
 class LevelData:
     """Класс для хранения данных уровней из оригинальной Java версии"""
     
@@ -15,19 +21,76 @@ class LevelData:
         10: 'exit'       # выход
     }
     
+    # Скомпилированный набор уровней (собирается командой python level_pack.py)
+    PACK_PATH = os.path.join(config.ASSETS_PATH, "levels.pack")
+    _pack = None
+    _pack_checked = False
+    
+    @staticmethod
+    def get_pack():
+        """Набор уровней из файла (открывается при первом обращении)
+        
+        None, если файла нет или он собран не из текущих уровней get_level_N -
+        тогда уровни берутся из методов этого модуля.
+        """
+        if not LevelData._pack_checked:
+            LevelData._pack_checked = True
+            LevelData._pack = LevelData.open_pack(LevelData.PACK_PATH)
+        return LevelData._pack
+    
+    @staticmethod
+    def open_pack(path):
+        """Открытие набора уровней, если он существует и совпадает с исходными уровнями"""
+        if not os.path.exists(path):
+            return None
+        try:
+            pack = LevelPack(path)
+        except ValueError as e:
+            print(f"Набор уровней не используется: {e}")
+            return None
+        if pack.source_key != get_source_key(pack_records(LevelData.get_builtin_levels())):
+            pack.close()
+            print(f"Набор уровней {path} устарел, используются уровни из level_data.py "
+                  f"(пересоберите: python level_pack.py)")
+            return None
+        return pack
+    
     @staticmethod
     def get_level(level_number):
-        """Получение данных уровня по номеру"""
-        if level_number == 1:
-            return LevelData.get_level_1()
-        elif level_number == 2:
-            return LevelData.get_level_2()
-        elif level_number == 3:
-            return LevelData.get_level_3()
-        elif level_number == 4:
-            return LevelData.get_level_4()
-        else:
+        """Получение данных уровня по номеру (тайлы в виде компактной TileGrid)"""
+        pack = LevelData.get_pack()
+        if pack is not None:
+            return pack.get_level(level_number)
+        return LevelData.get_builtin_level(level_number)
+    
+    @staticmethod
+    def get_level_count():
+        """Количество доступных уровней"""
+        pack = LevelData.get_pack()
+        if pack is not None:
+            return len(pack)
+        return len(LevelData.get_builtin_levels())
+    
+    @staticmethod
+    def get_builtin_level(level_number):
+        """Уровень из методов get_level_N этого модуля (источник для сборки набора)"""
+        get_level_n = getattr(LevelData, f"get_level_{level_number}", None)
+        if get_level_n is None:
             return None
+        
+        data = get_level_n()
+        data['tiles'] = TileGrid.from_rows(data['tiles'])
+        return data
+    
+    @staticmethod
+    def get_builtin_levels():
+        """Все уровни из методов get_level_N по порядку"""
+        levels = []
+        while True:
+            data = LevelData.get_builtin_level(len(levels) + 1)
+            if data is None:
+                return levels
+            levels.append(data)
     
     @staticmethod
     def get_level_1():
@@ -0,0 +1,161 @@
+import os
+import random
+import struct
+import config
+from tile_grid import TileGrid, TILE_CODES, TILE_NAMES, EMPTY, EARTH, BRICK_WALL, STONE, EXIT
+
+# Версия генератора входит в ключ кэша: при изменении алгоритма старые уровни не используются
+GENERATOR_VERSION = 1
+
+# Заполнение карты: 30% земли, 5% камней-тайлов, остальное пустота
+TERRAIN_WEIGHTS = ((EARTH, 0.3), (STONE, 0.05))
+# Объекты случайного уровня без сложности (как раньше в LevelState)
+BASE_OBJECT_COUNTS = (('crystal', 8), ('stone', 5), ('worm', 3), ('bubble', 2))
+ENEMY_TYPES = ('worm', 'fire')
+
+# Файл кэша: magic 'ESLG', версия генератора, размер, старт игрока, число объектов,
+# затем ширина*высота байт тайлов и записи объектов (x, y, код тайла объекта)
+CACHE_MAGIC = b'ESLG'
+CACHE_HEADER = struct.Struct('<4sHHHhhI')
+CACHE_OBJECT = struct.Struct('<HHB')
+
+
+def get_difficulty(difficulty):
+    """Параметры уровня по сложности (номеру уровня LevelManager), 0 - без усложнения"""
+    if difficulty <= 0:
+        return {'stone_probability': 0, 'enemy_count': 0, 'crystal_count': 8}
+    return {
+        # Доля пустых клеток, которые становятся камнями-тайлами
+        'stone_probability': min(0.3 + difficulty * 0.05, 0.6),
+        'enemy_count': min(2 + difficulty // 2, 8),
+        'crystal_count': min(5 + difficulty, 15)
+    }
+
+
+def sample_cells(rng, cells, taken, count):
+    """Выбор count разных свободных клеток без повторов (сколько найдется)"""
+    free = [cell for cell in cells if cell not in taken]
+    chosen = rng.sample(free, min(count, len(free)))
+    taken.update(chosen)
+    return chosen
+
+
+def generate_terrain(rng, width, height, stone_probability):
+    """Тайлы уровня: случайное заполнение, стартовая зона, выход и стены по краям"""
+    tiles = TileGrid.random_fill(width, height, rng, TERRAIN_WEIGHTS)
+    if stone_probability:
+        # Камни сложности ставятся только в пустые клетки правее стартовой зоны: там пустота
+        # с вероятностью stone_probability становится камнем, поэтому заполняем эти столбцы
+        # второй картой с пересчитанными весами
+        empty_share = 1 - sum(probability for _, probability in TERRAIN_WEIGHTS)
+        hard = TileGrid.random_fill(width, height, rng, (
+            (EARTH, 0.3), (STONE, 0.05 + empty_share * stone_probability)))
+        for y in range(1, height - 1):
+            start = y * width
+            tiles.data[start + 3:start + width - 1] = hard.data[start + 3:start + width - 1]
+
+    # Стартовая зона (левый верхний угол) - пустая
+    tiles.fill_rect(1, 1, 2, 2, EMPTY)
+    # Выход в правом нижнем углу
+    tiles.set(width - 2, height - 2, EXIT)
+    # Границы уровня - кирпичные стены
+    tiles.fill_border(BRICK_WALL)
+    return tiles
+
+
+def generate_level(seed, width=15, height=12, difficulty=0):
+    """Случайный уровень по seed и сложности в формате LevelData.get_level со списком объектов
+
+    Объекты не ищутся попытками, а выбираются без повторов из списка пустых
+    клеток, поэтому их всегда ровно столько, сколько задано (если хватает места).
+    """
+    rng = random.Random(seed)
+    settings = get_difficulty(difficulty)
+    tiles = generate_terrain(rng, width, height, settings['stone_probability'])
+
+    # Пустые клетки внутри стен (в порядке буфера - выбор зависит только от seed)
+    empty_cells = [(x, y) for x, y in tiles.positions(EMPTY)
+                   if 0 < x < width - 1 and 0 < y < height - 1]
+    objects_area = [(x, y) for x, y in empty_cells if x >= 3]
+    enemies_area = [(x, y) for x, y in objects_area if x >= 5]
+    # Кристаллы можно класть и левее, но не в стартовую зону
+    crystals_area = [(x, y) for x, y in empty_cells if x > 2 or y > 2]
+
+    taken = set()
+    objects = [(x, y, 'crystal') for x, y in sample_cells(rng, crystals_area, taken, settings['crystal_count'])]
+    for object_type, count in BASE_OBJECT_COUNTS:
+        if object_type != 'crystal':
+            objects += [(x, y, object_type) for x, y in sample_cells(rng, objects_area, taken, count)]
+    for x, y in sample_cells(rng, enemies_area, taken, settings['enemy_count']):
+        objects.append((x, y, rng.choice(ENEMY_TYPES)))
+
+    return make_level_data(tiles, objects)
+
+
+def make_level_data(tiles, objects, player_start=(1, 1)):
+    """Данные уровня: тайлы без объектов и список объектов (x, y, тип)"""
+    return {
+        'tiles': tiles,
+        'objects': objects,
+        'player_start': player_start,
+        'crystals_total': sum(1 for _, _, object_type in objects if object_type == 'crystal'),
+        'width': tiles.width,
+        'height': tiles.height
+    }
+
+
+def get_cache_path(seed, width, height, difficulty, cache_path=None):
+    """Файл кэша уровня: ключ - seed, сложность, размер и версия генератора"""
+    return os.path.join(cache_path or config.LEVEL_CACHE_PATH,
+                        f"v{GENERATOR_VERSION}_{seed}_{difficulty}_{width}x{height}.level")
+
+
+def save_level(path, level_data):
+    """Запись уровня в файл кэша (через временный файл, чтобы не оставить половину)"""
+    tiles = level_data['tiles']
+    objects = level_data['objects']
+    start_x, start_y = level_data['player_start']
+    parts = [CACHE_HEADER.pack(CACHE_MAGIC, GENERATOR_VERSION, tiles.width, tiles.height,
+                               start_x, start_y, len(objects)), bytes(tiles.data)]
+    parts += [CACHE_OBJECT.pack(x, y, TILE_CODES[object_type]) for x, y, object_type in objects]
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(b''.join(parts))
+    os.replace(temp_path, path)
+
+
+def load_level(path):
+    """Чтение уровня из файла кэша (ValueError, если файл поврежден или от другой версии)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < CACHE_HEADER.size:
+        raise ValueError(f"{path}: файл слишком короткий")
+    magic, version, width, height, start_x, start_y, object_count = CACHE_HEADER.unpack_from(data, 0)
+    if magic != CACHE_MAGIC or version != GENERATOR_VERSION:
+        raise ValueError(f"{path}: неизвестный формат уровня ({magic!r}, версия {version})")
+    objects_start = CACHE_HEADER.size + width * height
+    if len(data) != objects_start + object_count * CACHE_OBJECT.size:
+        raise ValueError(f"{path}: поврежден файл уровня")
+
+    tiles = TileGrid(width, height, data=data[CACHE_HEADER.size:objects_start])
+    objects = [(x, y, TILE_NAMES[code])
+               for x, y, code in CACHE_OBJECT.iter_unpack(data[objects_start:])]
+    return make_level_data(tiles, objects, (start_x, start_y))
+
+
+def get_cached_level(seed, width=15, height=12, difficulty=0, cache_path=None):
+    """Уровень из кэша на диске; при первом запросе генерируется и сохраняется"""
+    path = get_cache_path(seed, width, height, difficulty, cache_path)
+    try:
+        return load_level(path)
+    except (OSError, ValueError):
+        pass
+
+    level_data = generate_level(seed, width, height, difficulty)
+    try:
+        save_level(path, level_data)
+    except OSError as e:
+        print(f"Не удалось сохранить уровень в кэш {path}: {e}")
+    return level_data
@@ -0,0 +1,115 @@
+import hashlib
+import mmap
+import struct
+import sys
+from tile_grid import TileGrid
+
+# Формат набора уровней (все числа little-endian):
+#   заголовок:  magic 'ESLP', версия uint16, флаги uint16, количество уровней uint32,
+#               хеш исходных уровней 16 байт (см. get_source_key)
+#   индекс:     для каждого уровня смещение uint64 и размер записи uint32
+#   уровни:     ширина uint16, высота uint16, старт игрока int16 x2 (-1 - нет),
+#               нужно кристаллов uint32, затем ширина*высота байт кодов тайлов
+PACK_MAGIC = b'ESLP'
+PACK_VERSION = 2
+HEADER = struct.Struct('<4sHHI16s')
+INDEX_ENTRY = struct.Struct('<QI')
+LEVEL_HEADER = struct.Struct('<HHhhI')
+
+
+class LevelPack:
+    """Набор уровней в одном файле: уровни читаются по одному через mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: файл слишком короткий для набора уровней")
+        magic, version, _flags, self.count, self.source_key = HEADER.unpack_from(self.data, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"{path}: неизвестный формат набора уровней ({magic!r}, версия {version})")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Закрытие файла"""
+        self.data.close()
+        self.file.close()
+
+    def get_level(self, level_number):
+        """Данные уровня по номеру (с 1) в формате LevelData.get_level или None"""
+        if not 1 <= level_number <= self.count:
+            return None
+
+        offset, size = INDEX_ENTRY.unpack_from(self.data, HEADER.size + (level_number - 1) * INDEX_ENTRY.size)
+        width, height, start_x, start_y, crystals_total = LEVEL_HEADER.unpack_from(self.data, offset)
+        tiles_start = offset + LEVEL_HEADER.size
+        if size != LEVEL_HEADER.size + width * height:
+            raise ValueError(f"{self.path}: поврежден уровень {level_number}")
+
+        return {
+            'tiles': TileGrid(width, height, data=self.data[tiles_start:tiles_start + width * height]),
+            'player_start': (start_x, start_y) if start_x >= 0 else None,
+            'crystals_total': crystals_total,
+            'width': width,
+            'height': height
+        }
+
+
+def pack_records(levels):
+    """Записи уровней (данные в формате LevelData.get_level) в формате набора"""
+    records = []
+    for level in levels:
+        tiles = level['tiles']
+        if not isinstance(tiles, TileGrid):
+            tiles = TileGrid.from_rows(tiles)
+        start_x, start_y = level.get('player_start') or (-1, -1)
+        records.append(LEVEL_HEADER.pack(tiles.width, tiles.height, start_x, start_y,
+                                         level.get('crystals_total', 0)) + bytes(tiles.data))
+    return records
+
+
+def get_source_key(records):
+    """Хеш записей уровней: набор устарел, если исходные уровни дают другой хеш"""
+    digest = hashlib.blake2b(digest_size=16)
+    for record in records:
+        digest.update(record)
+    return digest.digest()
+
+
+def build_pack(path, levels):
+    """Запись набора уровней (данные в формате LevelData.get_level) в файл"""
+    records = pack_records(levels)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(records), get_source_key(records)))
+        offset = HEADER.size + INDEX_ENTRY.size * len(records)
+        for record in records:
+            f.write(INDEX_ENTRY.pack(offset, len(record)))
+            offset += len(record)
+        for record in records:
+            f.write(record)
+    return len(records)
+
+
+def main():
+    """Сборка набора из уровней LevelData: python level_pack.py [путь]"""
+    from level_data import LevelData
+
+    path = sys.argv[1] if len(sys.argv) > 1 else LevelData.PACK_PATH
+    count = build_pack(path, LevelData.get_builtin_levels())
+    print(f"Записано уровней: {count} в {path}")
+
+
+if __name__ == "__main__":
+    main()
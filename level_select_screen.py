@@ -14,6 +14,10 @@ class LevelSelectScreen:
         self.max_levels = 4
         self.selected_level = 1
         
+        # Состояние прошлого кадра для режима dirty rects
+        self.needs_full_redraw = True
+        self.last_state = None
+        
     def handle_event(self, event):
         """Обработка событий"""
         if event.type == pygame.KEYDOWN:
@@ -28,6 +32,20 @@ class LevelSelectScreen:
         
         return None
     
+    def invalidate(self):
+        """Следующий кадр в режиме dirty rects будет отрисован полностью"""
+        self.needs_full_redraw = True
+    
+    def render_dirty(self, screen):
+        """Экран статичен: перерисовываем его только после изменений"""
+        state = (self.selected_level,)
+        if not self.needs_full_redraw and state == self.last_state:
+            return []
+        self.render(screen)
+        self.needs_full_redraw = False
+        self.last_state = state
+        return [screen.get_rect()]
+    
     def update(self, dt, input_handler):
         """Обновление экрана"""
         pass
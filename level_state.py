@@ -0,0 +1,685 @@
+import random
+import re
+import secrets
+from array import array
+import config
+from chunked_world import ChunkedTileGrid, ObjectIndex
+from level_generator import generate_level, get_cached_level
+from object_state import ObjectState
+from object_store import (ObjectStore, OBJECT_TYPES, SLIDING_TYPES, FALL_STATE_CODES, NO_OBJECT,
+                          ACTIVE, MOVING, CAN_FALL)
+from tile_grid import (TileGrid, TILE_CODES, TILE_NAMES, EMPTY, EARTH, BRICK_WALL, STONE,
+                       PLAYER, FIRE, CRYSTAL, WORM, BUBBLE, EXIT)
+
+# Коды карт LevelData, которые становятся объектами: код -> (тип объекта, может ли падать)
+MAP_OBJECTS = {
+    STONE: ('stone', True),
+    FIRE: ('fire', False),
+    CRYSTAL: ('crystal', True),
+    WORM: ('worm', True),
+    BUBBLE: ('bubble', False),
+}
+# Клетки под объектами и стартом игрока на загруженной карте пустые
+MAP_TILE_TABLE = bytes(EMPTY if code in MAP_OBJECTS or code == PLAYER else code for code in range(256))
+# Поиск клеток с объектами и стартом игрока одним проходом по буферу карты
+MAP_OBJECT_CELLS = re.compile(b'[' + b''.join(re.escape(bytes([code])) for code in (*MAP_OBJECTS, PLAYER)) + b']')
+# Может ли объект данного типа падать
+OBJECT_CAN_FALL = {object_type: can_fall for object_type, can_fall in MAP_OBJECTS.values()}
+# Коды типов и состояний падения в массивах ObjectStore
+STABLE = FALL_STATE_CODES['stable']
+FALLING = FALL_STATE_CODES['falling']
+SLIDING = FALL_STATE_CODES['sliding']
+
+# Генерация чанков большой карты: доля пустых клеток с объектом и веса типов объектов
+CHUNK_OBJECT_DENSITY = 0.1
+CHUNK_OBJECT_WEIGHTS = (('crystal', 8), ('stone', 5), ('worm', 3), ('bubble', 2))
+
+class LevelState:
+    """Логика уровня (карта, объекты, гравитация, сбор) без отрисовки"""
+    
+    # Класс ссылок на объекты хранилища; отрисовываемый уровень использует объекты со спрайтами
+    object_class = ObjectState
+    
+    def __init__(self, game_settings=None, level_number=1, width=15, height=12, level_data=None,
+                 chunk_size=None, seed=None, difficulty=0, use_cache=False):
+        self.game_settings = game_settings
+        # Собственный генератор случайных чисел: один seed полностью определяет уровень
+        self.seed = seed if seed is not None else secrets.randbits(32)
+        self.rng = random.Random(self.seed)
+        self.tile_size = 64
+        self.width = width
+        self.height = height
+        self.level_number = level_number
+        # Сложность случайного уровня (см. level_generator.get_difficulty)
+        self.difficulty = difficulty
+        self.player_start = (1, 1)
+        self.from_level_data = level_data is not None
+        # Большая карта хранится чанками chunk_size x chunk_size, которые создаются по мере обращения
+        self.chunk_size = chunk_size
+        # События шага для звука и эффектов: имя -> сколько раз произошло (очищает Simulation)
+        self.events = {}
+        
+        if level_data is not None:
+            # Готовая карта из LevelData (размер берется из нее)
+            self.load_level_data(level_data)
+        elif chunk_size:
+            self.create_chunked_level()
+        elif use_cache:
+            # Тот же уровень генератора, но повторный запуск - чтение файла из кэша на диске
+            self.load_level_data(get_cached_level(self.seed, width, height, difficulty))
+        else:
+            # Случайная карта и объекты (кристаллы, камни, червяки, пузыри) из генератора уровней
+            self.load_level_data(generate_level(self.seed, width, height, difficulty))
+        
+        # Сохраняем общее количество кристаллов
+        self.total_crystals = self.get_total_crystals()
+        
+        # Физика - замедляем падение
+        self.gravity_timer = 0
+        self.gravity_interval = 0.2  # Интервал гравитации
+    
+    def load_level_data(self, level_data):
+        """Загрузка карты LevelData любого размера за один проход по буферу тайлов
+        
+        Коды объектов сразу превращаются в объекты без проверок занятости:
+        на карте в каждой клетке не больше одного объекта.
+        """
+        source = level_data['tiles']
+        if not isinstance(source, TileGrid):
+            source = TileGrid.from_rows(source)
+        self.width = source.width
+        self.height = source.height
+        
+        if 'objects' in level_data:
+            # Уровень генератора: тайлы без объектов (камни на карте - тайлы) и список объектов
+            self.tiles = source.copy()
+            self.clear_objects()
+            self.place_objects(level_data['objects'])
+            self.set_player_start(level_data['player_start'])
+            return
+        
+        self.tiles = TileGrid(self.width, self.height, data=source.data.translate(MAP_TILE_TABLE))
+        self.clear_objects()
+        
+        map_start = None
+        tile_size = self.tile_size
+        # Хранилище только что очищено - объекты получают номера подряд
+        object_id = len(self.objects)
+        xs, ys, object_types, can_fall_flags = [], [], [], []
+        for match in MAP_OBJECT_CELLS.finditer(source.data):
+            index = match.start()
+            y, x = divmod(index, self.width)
+            code = source.data[index]
+            if code == PLAYER:
+                map_start = (x, y)
+                continue
+            
+            object_type, can_fall = MAP_OBJECTS[code]
+            xs.append(x * tile_size)
+            ys.append(y * tile_size)
+            object_types.append(object_type)
+            can_fall_flags.append(can_fall)
+            self.object_grid[index] = object_id
+            self.total_counts[object_type] = self.total_counts.get(object_type, 0) + 1
+            # Все падающие объекты проверяются на первом тике гравитации
+            if can_fall:
+                self.awake_objects[object_id] = None
+            object_id += 1
+        self.objects.add_many(xs, ys, object_types, can_fall_flags)
+        self.active_counts = dict(self.total_counts)
+        
+        self.set_player_start(level_data.get('player_start') or map_start or self.player_start)
+    
+    def set_player_start(self, player_start):
+        """Стартовая клетка игрока (расчищается)"""
+        self.player_start = tuple(player_start)
+        if self.tiles.in_bounds(*self.player_start):
+            self.tiles.set(*self.player_start, EMPTY)
+    
+    def create_chunked_level(self):
+        """Создание большой карты: тайлы и объекты чанка генерируются при первом обращении к нему"""
+        self.world_seed = self.rng.getrandbits(32)
+        # Радиус (в чанках) вокруг игрока, который держится загруженным; дальше - выгружается
+        self.active_chunk_radius = 1
+        self.chunk_check_interval = 1.0
+        self.chunk_timer = 0
+        self.last_player_chunk = None
+        self.clear_objects()
+        self.tiles = ChunkedTileGrid(self.width, self.height, self.generate_chunk,
+                                     self.chunk_size, self.on_chunk_loaded)
+    
+    def get_chunk_rng(self, chunk_x, chunk_y, salt=0):
+        """Генератор случайных чисел чанка (одинаковый при каждой генерации)"""
+        return random.Random((self.world_seed * 2 + salt) ^ (chunk_x * 73856093) ^ (chunk_y * 19349663))
+    
+    def generate_chunk(self, chunk_x, chunk_y):
+        """Тайлы чанка: как level_generator.generate_terrain, но только для своего участка карты"""
+        size = self.chunk_size
+        tiles = TileGrid.random_fill(size, size, self.get_chunk_rng(chunk_x, chunk_y))
+        x0, y0 = chunk_x * size, chunk_y * size
+        
+        # Стартовая зона и выход - в координатах чанка (fill_rect обрезает по его границам)
+        tiles.fill_rect(1 - x0, 1 - y0, 2, 2, EMPTY)
+        tiles.fill_rect(self.width - 2 - x0, self.height - 2 - y0, 1, 1, EXIT)
+        # Границы карты - кирпичные стены
+        for x, y, width, height in ((0, 0, self.width, 1), (0, self.height - 1, self.width, 1),
+                                    (0, 0, 1, self.height), (self.width - 1, 0, 1, self.height)):
+            tiles.fill_rect(x - x0, y - y0, width, height, BRICK_WALL)
+        return tiles.data
+    
+    def generate_chunk_objects(self, chunk_x, chunk_y):
+        """Объекты нового чанка: (x, y, тип) в пустых клетках"""
+        rng = self.get_chunk_rng(chunk_x, chunk_y, salt=1)
+        types = [object_type for object_type, _ in CHUNK_OBJECT_WEIGHTS]
+        weights = [weight for _, weight in CHUNK_OBJECT_WEIGHTS]
+        chunk = self.tiles.chunks[(chunk_x, chunk_y)]
+        x0, y0 = chunk_x * self.chunk_size, chunk_y * self.chunk_size
+        
+        objects = []
+        index = chunk.find(EMPTY)
+        while index != -1:
+            y, x = divmod(index, self.chunk_size)
+            x += x0
+            y += y0
+            # Как в генераторе уровней: стартовая зона (x < 3) остается свободной
+            if (x < self.width and y < self.height and not (x < 3 and y < 3) and
+                    rng.random() < CHUNK_OBJECT_DENSITY):
+                objects.append((x, y, rng.choices(types, weights)[0]))
+            index = chunk.find(EMPTY, index + 1)
+        return objects
+    
+    def on_chunk_loaded(self, chunk_x, chunk_y, first_time):
+        """Чанк загружен: создаем или возвращаем его объекты и будим соседей на его границе"""
+        if first_time:
+            objects = self.generate_chunk_objects(chunk_x, chunk_y)
+        else:
+            objects = self.stored_objects.pop((chunk_x, chunk_y), [])
+            for _, _, object_type in objects:
+                self.stored_counts[object_type] -= 1
+        self.place_objects(objects)
+        
+        # Пока чанк не был загружен, соседи считали его сплошным
+        x0, y0 = chunk_x * self.chunk_size, chunk_y * self.chunk_size
+        x1 = min(x0 + self.chunk_size, self.width) - 1
+        y1 = min(y0 + self.chunk_size, self.height) - 1
+        for x in range(x0, x1 + 1):
+            self.wake_around(x, y0)
+        for y in range(y0, y1 + 1):
+            self.wake_around(x0, y)
+            self.wake_around(x1, y)
+    
+    def update_chunks(self, player_tile_x, player_tile_y):
+        """Загрузка чанков вокруг игрока и выгрузка далеких, в которых все объекты лежат"""
+        size = self.chunk_size
+        center_x, center_y = int(player_tile_x) // size, int(player_tile_y) // size
+        radius = self.active_chunk_radius
+        for chunk_y in range(max(0, center_y - radius), min(self.tiles.chunks_down, center_y + radius + 1)):
+            for chunk_x in range(max(0, center_x - radius), min(self.tiles.chunks_across, center_x + radius + 1)):
+                if (chunk_x, chunk_y) not in self.tiles.chunks:
+                    self.tiles.load_chunk(chunk_x, chunk_y)
+        
+        # Выгружаем с запасом в один чанк, чтобы не перезагружать чанки на границе
+        far = [key for key in self.tiles.chunks
+               if max(abs(key[0] - center_x), abs(key[1] - center_y)) > radius + 1]
+        if far:
+            self.unload_chunks(far)
+    
+    def unload_chunks(self, chunk_keys):
+        """Выгрузка чанков вместе с лежащими в них объектами (чанки с движением пропускаются)
+        
+        Просматриваются только объекты выгружаемых чанков, движущиеся и разбуженные,
+        поэтому стоимость не растет с пройденным игроком расстоянием.
+        """
+        size = self.chunk_size
+        tile_size = self.tile_size
+        store = self.objects
+        busy = set()
+        for object_id in (*store.moving, *self.awake_objects):
+            if not store.flags[object_id] & ACTIVE:
+                continue
+            # Движущийся объект занимает клетки и в исходном, и в целевом чанке
+            tile_x, tile_y = store.get_tile_pos(object_id)
+            busy.add((tile_x // size, tile_y // size))
+            busy.add((store.start_x[object_id] // tile_size // size, store.start_y[object_id] // tile_size // size))
+            busy.add((store.target_x[object_id] // tile_size // size, store.target_y[object_id] // tile_size // size))
+        
+        for key in chunk_keys:
+            if key in busy:
+                continue
+            stored = []
+            for object_id in sorted(self.chunk_object_ids.pop(key, ())):
+                object_type = OBJECT_TYPES[store.types[object_id]]
+                self.total_counts[object_type] -= 1
+                if store.flags[object_id] & ACTIVE:
+                    tile_x, tile_y = store.get_tile_pos(object_id)
+                    self.release_cell(object_id, tile_x, tile_y)
+                    self.active_counts[object_type] -= 1
+                    self.stored_counts[object_type] = self.stored_counts.get(object_type, 0) + 1
+                    stored.append((tile_x, tile_y, object_type))
+                # Собранные объекты не сохраняются: они учтены в collected_counts
+                store.release(object_id)
+            self.stored_objects[key] = stored
+            self.tiles.unload_chunk(*key)
+    
+    def get_object_chunk(self, object_id):
+        """Чанк, в списке которого числится объект: клетка покоя (у движущегося - исходная)"""
+        store = self.objects
+        if store.flags[object_id] & MOVING:
+            tile_x, tile_y = store.start_x[object_id] // self.tile_size, store.start_y[object_id] // self.tile_size
+        else:
+            tile_x, tile_y = store.get_tile_pos(object_id)
+        return (tile_x // self.chunk_size, tile_y // self.chunk_size)
+    
+    def clear_objects(self):
+        """Удаление всех объектов и сброс индексов и счетчиков"""
+        self.objects = self.create_object_store()
+        # Индекс занятости клеток: номер объекта в клетке (y * width + x) или NO_OBJECT
+        if self.chunk_size:
+            self.object_grid = ObjectIndex()
+        else:
+            self.object_grid = array('i', [NO_OBJECT]) * (self.width * self.height)
+        # Счетчики объектов по типам: активные, всего добавлено, собрано
+        self.active_counts = {}
+        self.total_counts = {}
+        self.collected_counts = {}
+        # Объекты выгруженных чанков большой карты: (chunk_x, chunk_y) -> [(x, y, тип)] и их счетчики
+        self.stored_objects = {}
+        self.stored_counts = {}
+        # Номера объектов загруженных чанков большой карты: (chunk_x, chunk_y) -> множество номеров
+        self.chunk_object_ids = {}
+        # Номера объектов, которые нужно проверить на падение (упорядоченное множество)
+        self.awake_objects = {}
+        self.last_player_tile = None
+    
+    def create_object_store(self):
+        """Хранилище объектов уровня"""
+        store = ObjectStore(self.object_class, self.game_settings, self.tile_size)
+        store.level = self
+        return store
+    
+    @property
+    def game_objects(self):
+        """Объекты уровня (ссылки на строки хранилища) в порядке добавления"""
+        store = self.objects
+        return [store.get(object_id) for object_id in store.ids()]
+    
+    def new_object(self, x, y, object_type):
+        """Создание объекта в хранилище (в пикселях); add_object размещает его на карте"""
+        store = self.objects
+        return store.get(store.add(x, y, object_type, OBJECT_CAN_FALL.get(object_type, False)))
+    
+    def place_objects(self, objects):
+        """Создание объектов из списка (x, y, тип) в тайлах"""
+        tile_size = self.tile_size
+        object_ids = self.objects.add_many([x * tile_size for x, _, _ in objects],
+                                           [y * tile_size for _, y, _ in objects],
+                                           [object_type for _, _, object_type in objects],
+                                           [OBJECT_CAN_FALL[object_type] for _, _, object_type in objects])
+        for object_id in object_ids:
+            self.register_object(object_id)
+    
+    def get_tile(self, x, y):
+        """Получение типа тайла"""
+        return TILE_NAMES[self.get_tile_code(x, y)]
+    
+    def get_tile_code(self, x, y):
+        """Получение кода тайла"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            if self.chunk_size:
+                return self.tiles.get(int(x), int(y))
+            return self.tiles.data[int(y) * self.width + int(x)]
+        return BRICK_WALL  # За границами - стена
+    
+    def set_tile(self, x, y, tile_type):
+        """Установка типа тайла"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.tiles.set(int(x), int(y), TILE_CODES[tile_type])
+            self.on_tile_changed(int(x), int(y))
+    
+    def on_tile_changed(self, tile_x, tile_y):
+        """Тайл изменился: будим соседние объекты"""
+        self.wake_around(tile_x, tile_y)
+    
+    def add_object(self, obj):
+        """Добавление объекта из new_object на уровень с регистрацией в индексе занятости"""
+        self.register_object(obj.id)
+        return obj
+    
+    def register_object(self, object_id):
+        """Учет объекта хранилища в счетчиках и индексе занятости"""
+        store = self.objects
+        object_type = OBJECT_TYPES[store.types[object_id]]
+        self.total_counts[object_type] = self.total_counts.get(object_type, 0) + 1
+        if self.chunk_size:
+            self.chunk_object_ids.setdefault(self.get_object_chunk(object_id), set()).add(object_id)
+        if store.flags[object_id] & ACTIVE:
+            self.active_counts[object_type] = self.active_counts.get(object_type, 0) + 1
+            tile_x, tile_y = store.get_tile_pos(object_id)
+            self.occupy_cell(object_id, tile_x, tile_y)
+            self.wake_around(tile_x, tile_y)
+    
+    def remove_object(self, obj):
+        """Полное удаление объекта с уровня (без учета как собранного); ссылка становится недействительной"""
+        if self.chunk_size:
+            self.chunk_object_ids[self.get_object_chunk(obj.id)].discard(obj.id)
+        obj.deactivate()
+        self.total_counts[obj.object_type] -= 1
+        self.objects.release(obj.id)
+    
+    def occupy_cell(self, object_id, tile_x, tile_y):
+        """Отметка клетки как занятой объектом"""
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            self.object_grid[tile_y * self.width + tile_x] = object_id
+    
+    def release_cell(self, object_id, tile_x, tile_y):
+        """Освобождение клетки, если она занята этим объектом"""
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            index = tile_y * self.width + tile_x
+            if self.object_grid[index] == object_id:
+                self.object_grid[index] = NO_OBJECT
+    
+    def wake_object(self, obj):
+        """Постановка объекта в очередь проверки гравитации"""
+        self.wake_id(obj.id)
+    
+    def wake_id(self, object_id):
+        """Постановка объекта с номером object_id в очередь проверки гравитации"""
+        if self.objects.flags[object_id] & CAN_FALL:
+            self.awake_objects[object_id] = None
+    
+    def wake_around(self, tile_x, tile_y):
+        """Изменилась клетка: будим объекты, чье падение или скольжение от нее зависит"""
+        # Объект падает, если пусто снизу, и скользит, если пусто сбоку и сбоку-снизу,
+        # поэтому клетка влияет на объекты в своей строке и строке выше (x-1..x+1)
+        for y in (tile_y - 1, tile_y):
+            if 0 <= y < self.height:
+                for x in (tile_x - 1, tile_x, tile_x + 1):
+                    if 0 <= x < self.width:
+                        object_id = self.object_grid[y * self.width + x]
+                        if object_id != NO_OBJECT:
+                            self.wake_id(object_id)
+    
+    def on_object_move_start(self, object_id, from_pos, to_pos):
+        """Объект начал движение: занимает целевую клетку, исходная остается занятой до завершения"""
+        to_x, to_y = int(to_pos[0] // self.tile_size), int(to_pos[1] // self.tile_size)
+        self.occupy_cell(object_id, to_x, to_y)
+        self.wake_around(to_x, to_y)
+    
+    def on_object_move_end(self, object_id, from_pos, to_pos):
+        """Объект завершил движение: освобождаем исходную клетку"""
+        from_x, from_y = int(from_pos[0] // self.tile_size), int(from_pos[1] // self.tile_size)
+        to_x, to_y = int(to_pos[0] // self.tile_size), int(to_pos[1] // self.tile_size)
+        self.release_cell(object_id, from_x, from_y)
+        self.occupy_cell(object_id, to_x, to_y)
+        if self.chunk_size:
+            size = self.chunk_size
+            from_chunk, to_chunk = (from_x // size, from_y // size), (to_x // size, to_y // size)
+            if from_chunk != to_chunk:
+                self.chunk_object_ids[from_chunk].discard(object_id)
+                self.chunk_object_ids.setdefault(to_chunk, set()).add(object_id)
+        self.wake_around(from_x, from_y)
+        self.wake_id(object_id)
+    
+    def on_object_deactivated(self, object_id):
+        """Объект убран с уровня: освобождаем все занятые им клетки"""
+        store = self.objects
+        self.active_counts[OBJECT_TYPES[store.types[object_id]]] -= 1
+        self.awake_objects.pop(object_id, None)
+        for pos_x, pos_y in ((store.start_x[object_id], store.start_y[object_id]),
+                             (store.target_x[object_id], store.target_y[object_id])):
+            self.release_cell(object_id, pos_x // self.tile_size, pos_y // self.tile_size)
+            self.wake_around(pos_x // self.tile_size, pos_y // self.tile_size)
+        tile_x, tile_y = store.get_tile_pos(object_id)
+        self.release_cell(object_id, tile_x, tile_y)
+        self.wake_around(tile_x, tile_y)
+    
+    def get_object_id(self, tile_x, tile_y):
+        """Номер объекта в указанной позиции (в тайлах) или NO_OBJECT"""
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            return self.object_grid[int(tile_y) * self.width + int(tile_x)]
+        return NO_OBJECT
+    
+    def get_object_at(self, tile_x, tile_y):
+        """Получение объекта в указанной позиции (в тайлах)"""
+        object_id = self.get_object_id(tile_x, tile_y)
+        return self.objects.get(object_id) if object_id != NO_OBJECT else None
+    
+    def collect_object(self, tile_x, tile_y):
+        """Сбор объекта в указанной позиции"""
+        store = self.objects
+        object_id = self.get_object_id(tile_x, tile_y)
+        if object_id != NO_OBJECT and store.flags[object_id] & ACTIVE:
+            object_type = OBJECT_TYPES[store.types[object_id]]
+            if object_type in ['crystal', 'worm']:
+                store.deactivate(object_id)
+                self.collected_counts[object_type] = self.collected_counts.get(object_type, 0) + 1
+                self.emit_event('collect')
+                if object_type == 'crystal' and self.get_crystals_count() == 0:
+                    self.emit_event('all_collected')
+                return object_type
+        return None
+    
+    def emit_event(self, name):
+        """Отметка игрового события шага (на логику уровня не влияет)"""
+        self.events[name] = self.events.get(name, 0) + 1
+    
+    def get_crystals_count(self):
+        """Получение количества оставшихся кристаллов"""
+        return self.get_object_count('crystal')
+    
+    def get_object_count(self, object_type):
+        """Количество активных объектов данного типа (включая выгруженные чанки)"""
+        return self.active_counts.get(object_type, 0) + self.stored_counts.get(object_type, 0)
+    
+    def get_collected_count(self, object_type):
+        """Количество собранных объектов данного типа"""
+        return self.collected_counts.get(object_type, 0)
+    
+    def get_player_start_position(self):
+        """Получение стартовой позиции игрока (в тайлах)"""
+        return self.player_start
+
+    def get_total_crystals(self):
+        """Получение общего количества кристаллов на уровне (оставшиеся и собранные)"""
+        return self.get_crystals_count() + self.get_collected_count('crystal')
+    
+    def check_consistency(self):
+        """Сверка счетчиков и индекса занятости с полным перебором объектов (отладка)"""
+        active_counts = {}
+        total_counts = {}
+        store = self.objects
+        chunk_object_ids = {}
+        for object_id in store.ids():
+            object_type = OBJECT_TYPES[store.types[object_id]]
+            flags = store.flags[object_id]
+            if self.chunk_size:
+                chunk_object_ids.setdefault(self.get_object_chunk(object_id), set()).add(object_id)
+            total_counts[object_type] = total_counts.get(object_type, 0) + 1
+            if flags & ACTIVE:
+                active_counts[object_type] = active_counts.get(object_type, 0) + 1
+                if not flags & MOVING:
+                    tile_x, tile_y = store.get_tile_pos(object_id)
+                    if self.get_object_id(tile_x, tile_y) != object_id:
+                        raise RuntimeError(f"Индекс занятости: {object_type} в ({tile_x}, {tile_y}) не найден")
+                    # Спящий объект не должен иметь возможности упасть
+                    if (object_id not in self.awake_objects and self.last_player_tile is not None and
+                            self.get_object_fall_direction(object_id, *self.last_player_tile)):
+                        raise RuntimeError(f"Планировщик гравитации: {object_type} в ({tile_x}, {tile_y}) спит, но может упасть")
+        
+        for counts, expected, name in ((self.active_counts, active_counts, 'активных'),
+                                       (self.total_counts, total_counts, 'всего')):
+            actual = {object_type: count for object_type, count in counts.items() if count}
+            if actual != expected:
+                raise RuntimeError(f"Счетчики объектов ({name}): {actual}, ожидалось {expected}")
+        
+        if {key: ids for key, ids in self.chunk_object_ids.items() if ids} != chunk_object_ids:
+            raise RuntimeError("Списки объектов чанков не совпадают с объектами хранилища")
+    
+    def can_object_move_to(self, from_tile_x, from_tile_y, to_tile_x, to_tile_y):
+        """Проверка, может ли объект переместиться в указанную позицию"""
+        # Проверяем границы
+        if to_tile_x < 0 or to_tile_x >= self.width or to_tile_y < 0 or to_tile_y >= self.height:
+            return False
+        
+        # Незагруженный чанк большой карты считается сплошным
+        if self.chunk_size and not self.tiles.is_loaded(to_tile_x, to_tile_y):
+            return False
+        
+        # Проверяем тип тайла
+        if self.get_tile_code(to_tile_x, to_tile_y) != EMPTY:
+            return False
+        
+        # Проверяем, нет ли другого объекта
+        target_id = self.object_grid[to_tile_y * self.width + to_tile_x]
+        if target_id != NO_OBJECT and self.objects.flags[target_id] & ACTIVE:
+            return False
+        
+        return True
+    
+    def get_object_fall_direction(self, object_id, player_tile_x, player_tile_y):
+        """Определение направления падения объекта с номером object_id"""
+        store = self.objects
+        flags = store.flags[object_id]
+        if not flags & CAN_FALL or flags & MOVING:
+            return None
+        
+        # Неподвижный объект стоит точно в клетке
+        obj_tile_x = int(store.x[object_id]) // self.tile_size
+        obj_tile_y = int(store.y[object_id]) // self.tile_size
+        if self.chunk_size and not self.tiles.is_loaded(obj_tile_x, obj_tile_y + 1):
+            return None
+        
+        # Проверяем прямое падение вниз
+        if self.can_object_move_to(obj_tile_x, obj_tile_y, obj_tile_x, obj_tile_y + 1):
+            # Проверяем, не заблокирован ли путь игроком
+            if obj_tile_x == player_tile_x and obj_tile_y + 1 == player_tile_y:
+                return None
+            return 'down'
+        
+        # Проверяем скольжение (только для камней и кристаллов)
+        if store.types[object_id] in SLIDING_TYPES:
+            # Что находится под объектом
+            below_tile = self.get_tile_code(obj_tile_x, obj_tile_y + 1)
+            below_id = self.get_object_id(obj_tile_x, obj_tile_y + 1)
+            
+            # Объект может скользить с твердых поверхностей
+            can_slide = (below_tile in (STONE, BRICK_WALL) or 
+                        (below_id != NO_OBJECT and store.types[below_id] in SLIDING_TYPES))
+            
+            if can_slide:
+                # Приоритет скольжения: сначала вправо, потом влево
+                for direction, dx in [('right', 1), ('left', -1)]:
+                    new_x = obj_tile_x + dx
+                    # Проверяем, можно ли скользнуть в сторону и вниз
+                    if (self.can_object_move_to(obj_tile_x, obj_tile_y, new_x, obj_tile_y) and
+                        self.can_object_move_to(new_x, obj_tile_y, new_x, obj_tile_y + 1)):
+                        # Проверяем, не заблокирован ли путь игроком
+                        if not ((new_x == player_tile_x and obj_tile_y == player_tile_y) or
+                               (new_x == player_tile_x and obj_tile_y + 1 == player_tile_y)):
+                            return direction
+        
+        return None
+    
+    def apply_gravity(self, player_tile_x, player_tile_y):
+        """Применение гравитации к объектам
+        
+        Проверяются только разбуженные объекты: остальные лежат устойчиво и
+        просыпаются, когда меняется соседняя клетка (см. wake_around).
+        """
+        # Игрок блокирует падение - его перемещение тоже меняет соседние клетки
+        player_tile = (int(player_tile_x), int(player_tile_y))
+        if player_tile != self.last_player_tile:
+            if self.last_player_tile is not None:
+                self.wake_around(*self.last_player_tile)
+            self.wake_around(*player_tile)
+            self.last_player_tile = player_tile
+        
+        store = self.objects
+        flags = store.flags
+        fall_states = store.fall_states
+        awake = self.awake_objects
+        self.awake_objects = {}
+        for object_id in awake:
+            if flags[object_id] & (ACTIVE | MOVING) != ACTIVE:
+                continue
+            
+            direction = self.get_object_fall_direction(object_id, player_tile_x, player_tile_y)
+            if not direction:
+                # Объект устойчив - засыпает до изменения соседних клеток
+                if fall_states[object_id] != STABLE:
+                    self.emit_event('land')
+                fall_states[object_id] = STABLE
+            else:
+                target_x = store.x[object_id]
+                target_y = store.y[object_id]
+                
+                if direction == 'down':
+                    target_y += self.tile_size
+                elif direction == 'left':
+                    target_x -= self.tile_size
+                elif direction == 'right':
+                    target_x += self.tile_size
+                
+                # Запускаем движение
+                if store.start_movement(object_id, target_x, target_y):
+                    if fall_states[object_id] == STABLE:
+                        self.emit_event('fall')
+                    # Устанавливаем состояние падения
+                    if direction in ['left', 'right']:
+                        fall_states[object_id] = SLIDING
+                    else:
+                        fall_states[object_id] = FALLING
+    
+    def update(self, dt, player_tile_x=None, player_tile_y=None):
+        """Обновление уровня"""
+        # Обновляем анимацию объектов
+        self.update_animations(dt)
+        
+        # Большая карта: держим загруженными только чанки вокруг игрока
+        if self.chunk_size and player_tile_x is not None and player_tile_y is not None:
+            self.chunk_timer += dt
+            player_chunk = (int(player_tile_x) // self.chunk_size, int(player_tile_y) // self.chunk_size)
+            if player_chunk != self.last_player_chunk or self.chunk_timer >= self.chunk_check_interval:
+                self.chunk_timer = 0
+                self.last_player_chunk = player_chunk
+                self.update_chunks(player_tile_x, player_tile_y)
+        
+        # Применяем гравитацию
+        self.gravity_timer += dt
+        if self.gravity_timer >= self.gravity_interval:
+            self.gravity_timer = 0
+            if player_tile_x is not None and player_tile_y is not None:
+                self.apply_gravity(player_tile_x, player_tile_y)
+        
+        if config.DEBUG_CHECKS:
+            self.check_consistency()
+    
+    def update_animations(self, dt):
+        """Обновление анимации и движения объектов (проходы по массивам хранилища)"""
+        self.objects.update_animations(dt)
+        self.objects.update(dt)
+    
+    def can_player_move_to(self, tile_x, tile_y):
+        """Проверка, может ли игрок переместиться в указанную позицию"""
+        # Проверяем границы
+        if tile_x < 0 or tile_x >= self.width or tile_y < 0 or tile_y >= self.height:
+            return False
+        
+        # Проверяем тип тайла
+        tile_code = self.get_tile_code(tile_x, tile_y)
+        
+        # Можно ходить по пустым местам и земле
+        if tile_code == EMPTY or tile_code == EARTH:
+            # Проверяем, нет ли блокирующих объектов
+            object_id = self.get_object_id(tile_x, tile_y)
+            if (object_id != NO_OBJECT and self.objects.flags[object_id] & ACTIVE and
+                    OBJECT_TYPES[self.objects.types[object_id]] in ['stone', 'bubble']):
+                return False  # Камни и пузыри блокируют движение
+            return True
+        
+        # Можно войти в выход (дверь)
+        if tile_code == EXIT:
+            return True
+        
+        # Нельзя проходить через стены и камни-тайлы
+        return False
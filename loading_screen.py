@@ -0,0 +1,63 @@
+import pygame
+
+class LoadingScreen:
+    def __init__(self, width, height, asset_loader):
+        self.width = width
+        self.height = height
+        self.asset_loader = asset_loader
+
+        # Шрифт создается один раз: экран должен появляться сразу
+        self.font = pygame.font.Font(None, 36)
+        self.font_small = pygame.font.Font(None, 24)
+
+        # Полоса прогресса
+        self.bar_rect = pygame.Rect(width // 4, height // 2, width // 2, 24)
+
+        # Состояние прошлого кадра для режима dirty rects
+        self.needs_full_redraw = True
+        self.last_state = None
+
+    def handle_event(self, event):
+        """Во время загрузки ввод не обрабатывается"""
+        return None
+
+    def update(self, dt, input_handler):
+        """Переход в меню, когда загружены ресурсы, нужные до его показа"""
+        if self.asset_loader.is_ready():
+            return "LOADING_DONE"
+        return None
+
+    def invalidate(self):
+        """Следующий кадр в режиме dirty rects будет отрисован полностью"""
+        self.needs_full_redraw = True
+
+    def render_dirty(self, screen):
+        """Перерисовка только при изменении прогресса"""
+        state = (round(self.asset_loader.get_progress(), 2), tuple(self.asset_loader.get_pending_names()))
+        if not self.needs_full_redraw and state == self.last_state:
+            return []
+        self.render(screen)
+        self.needs_full_redraw = False
+        self.last_state = state
+        return [screen.get_rect()]
+
+    def render(self, screen):
+        """Отрисовка экрана загрузки"""
+        screen.fill((0, 0, 0))
+
+        title = self.font.render("Loading...", True, (255, 255, 255))
+        screen.blit(title, title.get_rect(center=(self.width // 2, self.bar_rect.top - 40)))
+
+        # Полоса прогресса
+        progress = self.asset_loader.get_progress()
+        pygame.draw.rect(screen, (64, 64, 64), self.bar_rect)
+        filled = self.bar_rect.copy()
+        filled.width = int(self.bar_rect.width * progress)
+        pygame.draw.rect(screen, (255, 255, 0), filled)
+        pygame.draw.rect(screen, (255, 255, 255), self.bar_rect, 2)
+
+        # Что сейчас загружается
+        pending = self.asset_loader.get_pending_names()
+        if pending:
+            text = self.font_small.render(", ".join(pending), True, (128, 128, 128))
+            screen.blit(text, text.get_rect(center=(self.width // 2, self.bar_rect.bottom + 30)))
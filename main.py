@@ -1,15 +1,49 @@
+import argparse
+import cProfile
 import pygame
 import sys
 import os
+import time
+import config
+from frame_tracer import FrameTracer
 from game import Game
+from sound_manager import pre_init_mixer
 from setup_assets import create_assets_folder
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="EarthShaker")
+    parser.add_argument('--trace', metavar='FILE.json',
+                        help="записать интервалы главного цикла в формате Chrome trace events")
+    parser.add_argument('--profile', metavar='FILE.pstats', help="профилировать кадры через cProfile")
+    parser.add_argument('--frames', type=int, default=None,
+                        help="сколько кадров записывать (по умолчанию: трасса - до выхода, cProfile - 600)")
+    return parser.parse_args()
+
+
+def finish_capture(tracer, profiler, args):
+    """Остановка записи, сохранение профиля и трассы"""
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"Профиль cProfile сохранен: {args.profile}")
+    if tracer is not None and tracer.recording:
+        tracer.stop()
+        count = tracer.save()
+        print(f"Трасса ({tracer.frame_count} кадров, {count} интервалов) сохранена: {args.trace}")
+
+
 def main():
+    args = parse_args()
+    start_time = time.perf_counter()
+    
     # Создаем папку assets если её нет
     create_assets_folder()
     
-    # Инициализация pygame
-    pygame.init()
+    # Инициализация pygame: только экран и шрифты, микшер включается при первом звуке
+    # с размером буфера и частотой из пресета звука
+    pre_init_mixer(config.AUDIO_PRESET)
+    pygame.display.init()
+    pygame.font.init()
     
     # Настройки экрана
     SCREEN_WIDTH = 800
@@ -23,10 +57,28 @@ def main():
     # Создаем игру
     game = Game(screen, SCREEN_WIDTH, SCREEN_HEIGHT)
     
-    # Основной игровой цикл
+    # Режимы записи: трасса интервалов и cProfile для первых кадров
+    tracer = None
+    if args.trace:
+        tracer = FrameTracer(args.trace)
+        tracer.trace_game(game)
+        game.tracer = tracer
+    profiler = None
+    capture_frames = args.frames
+    if args.profile:
+        profiler = cProfile.Profile()
+        capture_frames = capture_frames or 600
+        profiler.enable()
+    frame = 0
+    
+    # Основной игровой цикл: симуляция фиксированными шагами, отрисовка с интерполяцией
+    fixed_dt = 1.0 / config.SIMULATION_RATE
+    accumulator = 0.0
     running = True
     while running:
-        dt = clock.tick(FPS) / 1000.0  # Время в секундах
+        accumulator += clock.tick(FPS) / 1000.0  # Время в секундах
+        if tracer is not None:
+            tracer.begin_frame()
         
         # Обработка событий
         for event in pygame.event.get():
@@ -39,12 +91,40 @@ def main():
                     running = False
         
         # Обновление игры
-        game.update(dt)
+        steps = 0
+        while accumulator >= fixed_dt and steps < config.MAX_SIMULATION_STEPS:
+            game.update(fixed_dt)
+            accumulator -= fixed_dt
+            steps += 1
+        
+        # После долгого кадра не пытаемся догнать все пропущенные шаги
+        if steps == config.MAX_SIMULATION_STEPS:
+            accumulator = min(accumulator, fixed_dt)
         
         # Отрисовка
-        game.render()
-        pygame.display.flip()
+        dirty_rects = game.render(accumulator / fixed_dt)
+        if dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        
+        if tracer is not None:
+            tracer.end_frame()
+        frame += 1
+        if frame == capture_frames:
+            finish_capture(tracer, profiler, args)
+            tracer = profiler = game.tracer = None
+        
+        # Отчет о запуске после первого показанного кадра меню (после экрана загрузки)
+        if start_time is not None and game.current_screen == 'MENU':
+            if config.STARTUP_REPORT:
+                print(game.get_startup_report((time.perf_counter() - start_time) * 1000))
+            start_time = None
     
+    if config.AUDIO_LATENCY_REPORT:
+        print(game.sound_manager.get_latency_report())
+    finish_capture(tracer, profiler, args)
+    game.shutdown()
     pygame.quit()
     sys.exit()
 
@@ -19,6 +19,11 @@ class MenuScreen:
         self.title_pulse = 0
         self.pulse_speed = 2
         
+        # Состояние прошлого кадра для режима dirty rects
+        self.needs_full_redraw = True
+        self.last_selected_item = None
+        self.last_title_rect = None
+        
     def handle_event(self, event):
         """Обработка событий меню"""
         if event.type == pygame.KEYDOWN:
@@ -50,18 +55,42 @@ class MenuScreen:
         # Анимация пульсации заголовка
         self.title_pulse += dt * self.pulse_speed
     
-    def render(self, screen):
-        """Отрисовка меню"""
-        # Градиентный фон
-        self.draw_gradient_background(screen)
+    def invalidate(self):
+        """Следующий кадр в режиме dirty rects будет отрисован полностью"""
+        self.needs_full_redraw = True
+    
+    def render_dirty(self, screen):
+        """Отрисовка только изменившихся областей, возвращает их список"""
+        if self.needs_full_redraw or self.selected_item != self.last_selected_item:
+            self.render(screen)
+            self.needs_full_redraw = False
+            self.last_selected_item = self.selected_item
+            return [screen.get_rect()]
         
-        # Заголовок с пульсацией
+        # Меняется только цвет пульсирующего заголовка
+        previous_rect = self.last_title_rect
+        self.draw_gradient_background(screen, previous_rect)
+        title_rect = self.render_title(screen)
+        return [title_rect.union(previous_rect)]
+    
+    def render_title(self, screen):
+        """Отрисовка заголовка с пульсацией, возвращает его прямоугольник"""
         pulse_scale = 1.0 + 0.1 * abs(math.cos(self.title_pulse))
         title_color = (255, 255, int(200 + 55 * abs(math.sin(self.title_pulse))))
         
         title = self.font_large.render("EARTHSHAKER", True, title_color)
         title_rect = title.get_rect(center=(self.width // 2, 150))
         screen.blit(title, title_rect)
+        self.last_title_rect = title_rect
+        return title_rect
+    
+    def render(self, screen):
+        """Отрисовка меню"""
+        # Градиентный фон
+        self.draw_gradient_background(screen)
+        
+        # Заголовок с пульсацией
+        self.render_title(screen)
         
         # Подзаголовок
         subtitle = self.font_small.render("ZX80 Game Remake", True, (200, 200, 200))
@@ -117,11 +146,14 @@ class MenuScreen:
         info_rect = info_surface.get_rect(center=(self.width // 2, self.height - 40))
         screen.blit(info_surface, info_rect)
     
-    def draw_gradient_background(self, screen):
-        """Отрисовка градиентного фона"""
+    def draw_gradient_background(self, screen, area=None):
+        """Отрисовка градиентного фона (целиком или только в области area)"""
+        if area is None:
+            area = pygame.Rect(0, 0, self.width, self.height)
+        
         # Простой градиент от темно-синего к черному
-        for y in range(self.height):
+        for y in range(max(0, area.top), min(self.height, area.bottom)):
             ratio = y / self.height
             color_value = int(40 * (1 - ratio))
             color = (0, 0, color_value)
-            pygame.draw.line(screen, color, (0, y), (self.width, y))
+            pygame.draw.line(screen, color, (area.left, y), (area.right - 1, y))
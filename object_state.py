@@ -0,0 +1,139 @@
+from object_store import OBJECT_TYPES, OBJECT_TYPE_CODES, FALL_STATES, FALL_STATE_CODES, ALIVE, ACTIVE, MOVING, CAN_FALL
+
+
+class ObjectState:
+    """Логика игрового объекта (позиция, движение, физика) без отрисовки
+
+    Ссылка на строку объекта в ObjectStore: сами данные лежат в массивах
+    хранилища, поэтому у ссылки нет __dict__. Две ссылки на один объект равны.
+    """
+
+    __slots__ = ('store', 'id')
+
+    def __init__(self, store, object_id):
+        self.store = store
+        self.id = object_id
+
+    def __eq__(self, other):
+        return isinstance(other, ObjectState) and other.store is self.store and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.id} {self.object_type} at {self.get_tile_pos()}>"
+
+    # Позиция
+    @property
+    def x(self):
+        return self.store.x[self.id]
+
+    @x.setter
+    def x(self, value):
+        self.store.x[self.id] = value
+
+    @property
+    def y(self):
+        return self.store.y[self.id]
+
+    @y.setter
+    def y(self, value):
+        self.store.y[self.id] = value
+
+    @property
+    def prev_x(self):
+        return self.store.prev_x[self.id]
+
+    @property
+    def prev_y(self):
+        return self.store.prev_y[self.id]
+
+    # Движение
+    @property
+    def is_moving(self):
+        return bool(self.store.flags[self.id] & MOVING)
+
+    @property
+    def move_timer(self):
+        return self.store.move_timers[self.id]
+
+    @property
+    def move_duration(self):
+        return self.store.move_duration
+
+    @property
+    def start_pos(self):
+        return (self.store.start_x[self.id], self.store.start_y[self.id])
+
+    @property
+    def target_pos(self):
+        return (self.store.target_x[self.id], self.store.target_y[self.id])
+
+    # Тип и физические свойства
+    @property
+    def active(self):
+        return bool(self.store.flags[self.id] & ACTIVE)
+
+    @property
+    def object_type(self):
+        return OBJECT_TYPES[self.store.types[self.id]]
+
+    @object_type.setter
+    def object_type(self, value):
+        self.store.types[self.id] = OBJECT_TYPE_CODES[value]
+
+    @property
+    def can_fall(self):
+        return bool(self.store.flags[self.id] & CAN_FALL)
+
+    @can_fall.setter
+    def can_fall(self, value):
+        if value:
+            self.store.flags[self.id] |= CAN_FALL
+        else:
+            self.store.flags[self.id] &= ~CAN_FALL
+
+    @property
+    def fall_state(self):
+        return FALL_STATES[self.store.fall_states[self.id]]
+
+    @fall_state.setter
+    def fall_state(self, value):
+        self.store.fall_states[self.id] = FALL_STATE_CODES[value]
+
+    # Общие для всех объектов хранилища
+    @property
+    def level(self):
+        """Уровень объекта (None, если объект убран с уровня)"""
+        return self.store.level if self.store.flags[self.id] & ALIVE else None
+
+    @property
+    def game_settings(self):
+        return self.store.game_settings
+
+    @property
+    def tile_size(self):
+        return self.store.tile_size
+
+    def start_movement(self, target_x, target_y):
+        """Начало движения к цели"""
+        return self.store.start_movement(self.id, target_x, target_y)
+
+    def finish_movement(self):
+        """Завершение движения в целевой клетке"""
+        self.store.finish_movement(self.id)
+
+    def deactivate(self):
+        """Удаление объекта с уровня (сбор, уничтожение)"""
+        self.store.deactivate(self.id)
+
+    def get_render_pos(self, alpha=1.0):
+        """Позиция для отрисовки между предыдущим и текущим шагом симуляции"""
+        store, object_id = self.store, self.id
+        prev_x, prev_y = store.prev_x[object_id], store.prev_y[object_id]
+        return (prev_x + (store.x[object_id] - prev_x) * alpha,
+                prev_y + (store.y[object_id] - prev_y) * alpha)
+
+    def get_tile_pos(self):
+        """Получение позиции в тайлах"""
+        return self.store.get_tile_pos(self.id)
@@ -0,0 +1,234 @@
+from array import array
+
+# Типы объектов: код в массиве types -> имя
+OBJECT_TYPES = ('unknown', 'stone', 'fire', 'crystal', 'worm', 'bubble')
+OBJECT_TYPE_CODES = {name: code for code, name in enumerate(OBJECT_TYPES)}
+# Типы, которые скользят с камней и кристаллов и сами служат опорой для скольжения
+SLIDING_TYPES = frozenset(OBJECT_TYPE_CODES[name] for name in ('stone', 'crystal'))
+# Состояния падения: код в массиве fall_states -> имя
+FALL_STATES = ('stable', 'falling', 'sliding')
+FALL_STATE_CODES = {name: code for code, name in enumerate(FALL_STATES)}
+
+# Флаги объекта (массив flags): строка занята, объект на уровне, движется, может падать
+ALIVE = 1
+ACTIVE = 2
+MOVING = 4
+CAN_FALL = 8
+
+# Пустая клетка в индексе занятости (номер объекта или NO_OBJECT)
+NO_OBJECT = -1
+
+
+class ObjectStore:
+    """Состояние всех объектов уровня в параллельных массивах, индекс - номер объекта
+
+    Объект - это строка массивов; ObjectState и GameObject - легкие ссылки
+    (store, номер) на нее. Номера освобожденных объектов используются снова,
+    поэтому ссылка действительна, пока объект на уровне. Массовые проходы
+    (движение, анимация) идут по массивам, а не по объектам Python.
+    """
+
+    def __init__(self, handle_class, game_settings=None, tile_size=64, move_duration=0.15):
+        self.handle_class = handle_class
+        self.game_settings = game_settings
+        self.tile_size = tile_size
+        self.move_duration = move_duration
+        # Уровень, которому сообщается о движении и удалении объектов
+        self.level = None
+        # Спрайты для GameObject: загрузчик и кадры по кодам типов
+        self.sprite_loader = None
+        self.type_sprites = {}
+        self.animation_speed = 0.25
+
+        # Позиция сейчас и на предыдущем шаге симуляции (для интерполяции при отрисовке)
+        self.x = array('d')
+        self.y = array('d')
+        self.prev_x = array('d')
+        self.prev_y = array('d')
+        # Движение: начало и цель в пикселях, таймер
+        self.start_x = array('i')
+        self.start_y = array('i')
+        self.target_x = array('i')
+        self.target_y = array('i')
+        self.move_timers = array('d')
+        # Тип, состояние падения, флаги
+        self.types = array('B')
+        self.fall_states = array('B')
+        self.flags = array('B')
+        # Анимация: кадр и таймер
+        self.frames = array('B')
+        self.animation_timers = array('d')
+
+        self.free_ids = []
+        # Номера движущихся объектов
+        self.moving = set()
+
+    def __len__(self):
+        """Количество строк (вместе со свободными)"""
+        return len(self.flags)
+
+    def add(self, x, y, object_type='unknown', can_fall=False):
+        """Новый объект в пикселях, возвращает его номер"""
+        if self.free_ids:
+            object_id = self.free_ids.pop()
+            self.x[object_id] = self.prev_x[object_id] = x
+            self.y[object_id] = self.prev_y[object_id] = y
+            self.start_x[object_id] = self.target_x[object_id] = int(x)
+            self.start_y[object_id] = self.target_y[object_id] = int(y)
+            self.move_timers[object_id] = 0
+            self.types[object_id] = OBJECT_TYPE_CODES[object_type]
+            self.fall_states[object_id] = 0
+            self.flags[object_id] = ALIVE | ACTIVE | (CAN_FALL if can_fall else 0)
+            self.frames[object_id] = 0
+            self.animation_timers[object_id] = 0
+            return object_id
+
+        return self.add_many([x], [y], [object_type], [can_fall])[0]
+
+    def add_many(self, xs, ys, object_types, can_fall):
+        """Новые объекты из столбцов (x и y в пикселях, типы, может ли падать), возвращает их номера
+
+        Сначала занимаются свободные номера, остальные объекты дописываются
+        в конец массивов одним проходом по каждому столбцу.
+        """
+        reused = min(len(self.free_ids), len(xs))
+        ids = [self.add(xs[i], ys[i], object_types[i], can_fall[i]) for i in range(reused)]
+        if reused:
+            xs, ys, object_types, can_fall = xs[reused:], ys[reused:], object_types[reused:], can_fall[reused:]
+        count = len(xs)
+        if not count:
+            return ids
+        first_id = len(self.flags)
+        # Столбец собирается во временный массив: дописывание массива в массив - копирование памяти
+        starts_x = array('i', [int(x) for x in xs])
+        starts_y = array('i', [int(y) for y in ys])
+        xs, ys = array('d', xs), array('d', ys)
+        for column, values in ((self.x, xs), (self.y, ys), (self.prev_x, xs), (self.prev_y, ys),
+                               (self.start_x, starts_x), (self.start_y, starts_y),
+                               (self.target_x, starts_x), (self.target_y, starts_y)):
+            column.extend(values)
+        self.types.fromlist([OBJECT_TYPE_CODES[object_type] for object_type in object_types])
+        self.flags.fromlist([ALIVE | ACTIVE | CAN_FALL if fall else ALIVE | ACTIVE for fall in can_fall])
+        zeros = bytes(count)
+        self.fall_states.frombytes(zeros)
+        self.frames.frombytes(zeros)
+        self.move_timers.extend(array('d', [0]) * count)
+        self.animation_timers.extend(array('d', [0]) * count)
+        return ids + list(range(first_id, first_id + count))
+
+    def release(self, object_id):
+        """Освобождение строки объекта (объект больше не на уровне)"""
+        self.flags[object_id] = 0
+        self.moving.discard(object_id)
+        self.free_ids.append(object_id)
+
+    def get(self, object_id):
+        """Ссылка на объект по номеру"""
+        return self.handle_class(self, object_id)
+
+    def ids(self):
+        """Номера объектов на уровне по порядку"""
+        flags = self.flags
+        return [object_id for object_id in range(len(flags)) if flags[object_id]]
+
+    def get_tile_pos(self, object_id):
+        """Клетка объекта"""
+        return (int(self.x[object_id] // self.tile_size), int(self.y[object_id] // self.tile_size))
+
+    def start_movement(self, object_id, target_x, target_y):
+        """Начало движения к цели (False, если объект уже движется)"""
+        flags = self.flags[object_id]
+        if flags & MOVING:
+            return False
+
+        self.flags[object_id] = flags | MOVING
+        self.moving.add(object_id)
+        self.move_timers[object_id] = 0
+        start_x = self.start_x[object_id] = int(self.x[object_id])
+        start_y = self.start_y[object_id] = int(self.y[object_id])
+        self.target_x[object_id] = int(target_x)
+        self.target_y[object_id] = int(target_y)
+
+        if self.level:
+            self.level.on_object_move_start(object_id, (start_x, start_y), (int(target_x), int(target_y)))
+
+        # Если плавная анимация выключена, сразу перемещаемся
+        if self.game_settings and not self.game_settings.smooth_movement:
+            self.finish_movement(object_id)
+        return True
+
+    def finish_movement(self, object_id):
+        """Завершение движения в целевой клетке"""
+        target = (self.target_x[object_id], self.target_y[object_id])
+        self.x[object_id], self.y[object_id] = target
+        self.flags[object_id] &= ~MOVING
+        self.moving.discard(object_id)
+        if self.level:
+            self.level.on_object_move_end(object_id, (self.start_x[object_id], self.start_y[object_id]), target)
+
+    def deactivate(self, object_id):
+        """Удаление объекта с уровня (сбор, уничтожение)"""
+        flags = self.flags[object_id]
+        if not flags & ACTIVE:
+            return
+        self.flags[object_id] = flags & ~(ACTIVE | MOVING)
+        if flags & MOVING:
+            # Прерванное движение: объект остается в исходной клетке и больше не движется
+            self.moving.discard(object_id)
+            self.x[object_id] = self.start_x[object_id]
+            self.y[object_id] = self.start_y[object_id]
+        if self.level:
+            self.level.on_object_deactivated(object_id)
+
+    def update(self, dt):
+        """Шаг всех объектов: запоминаем позиции для интерполяции и двигаем движущиеся"""
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        if self.moving and self.game_settings and self.game_settings.smooth_movement:
+            self.update_movement(dt)
+
+    def update_movement(self, dt):
+        """Плавное движение: интерполяция от начала к цели, по порядку номеров"""
+        x, y, timers, flags = self.x, self.y, self.move_timers, self.flags
+        duration = self.move_duration
+        for object_id in sorted(self.moving):
+            if not flags[object_id] & ACTIVE:
+                continue
+            timers[object_id] += dt
+            progress = min(1.0, timers[object_id] / duration)
+            start_x, start_y = self.start_x[object_id], self.start_y[object_id]
+            x[object_id] = start_x + (self.target_x[object_id] - start_x) * progress
+            y[object_id] = start_y + (self.target_y[object_id] - start_y) * progress
+            if progress >= 1.0:
+                self.finish_movement(object_id)
+
+    def get_sprites(self, type_code):
+        """Кадры анимации типа объекта (список, может быть пустым)"""
+        sprites = self.type_sprites.get(type_code)
+        if sprites is None:
+            sprite = self.sprite_loader.get_sprite(OBJECT_TYPES[type_code]) if self.sprite_loader else None
+            sprites = sprite if isinstance(sprite, list) else ([sprite] if sprite else [])
+            self.type_sprites[type_code] = sprites
+        return sprites
+
+    def update_animations(self, dt):
+        """Смена кадров анимации активных объектов, у типа которых больше одного кадра"""
+        if self.sprite_loader is None:
+            return
+        frame_counts = {}
+        for type_code in set(self.types):
+            count = len(self.get_sprites(type_code))
+            if count > 1:
+                frame_counts[type_code] = count
+        if not frame_counts:
+            return
+
+        timers, frames, types, flags = self.animation_timers, self.frames, self.types, self.flags
+        speed = self.animation_speed
+        for object_id in range(len(flags)):
+            count = frame_counts.get(types[object_id])
+            if count and flags[object_id] & ACTIVE:
+                timers[object_id] += dt
+                if timers[object_id] >= speed:
+                    timers[object_id] = 0
+                    frames[object_id] = (frames[object_id] + 1) % count
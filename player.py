@@ -1,50 +1,25 @@
+import math
 import pygame
+from player_state import PlayerState
 
-class Player:
+class Player(PlayerState):
+    """Игрок со спрайтом: логика из PlayerState, здесь только анимация и отрисовка"""
+    
     def __init__(self, x, y, sprite_loader, game_settings):
-        self.x = x
-        self.y = y
+        super().__init__(x, y, game_settings)
         self.sprite_loader = sprite_loader
-        self.game_settings = game_settings
-        self.tile_size = 64
-        self.speed = 200  # пикселей в секунду
         
         # Анимация
         self.animation_timer = 0
         self.animation_frame = 0
         self.animation_speed = 0.25  # смена кадра каждые 0.25 секунды
         
-        # Состояние движения
-        self.is_moving = False
-        self.move_timer = 0
-        self.move_duration = 0.2  # время на один шаг
-        self.start_pos = (x, y)
-        self.target_pos = (x, y)
-        
-        # Для поддержки удержания клавиш
-        self.key_repeat_timer = 0
-        self.key_repeat_delay = 0.15  # задержка между повторами при удержании
-        
-        # Игровая статистика
-        self.crystals_collected = 0
-        
     def update(self, dt, input_handler, level):
         """Обновление игрока"""
         # Обновляем анимацию
         self.update_animation(dt)
         
-        # Если не двигаемся, проверяем ввод
-        if not self.is_moving:
-            self.handle_input(input_handler, level, dt)
-        else:
-            # Продолжаем движение (только если включена плавная анимация)
-            if self.game_settings.smooth_movement:
-                self.update_movement(dt, level)
-            else:
-                # При выключенной анимации сразу завершаем движение
-                self.x, self.y = self.target_pos
-                self.is_moving = False
-                self.handle_tile_interaction(level)
+        return super().update(dt, input_handler, level)
     
     def update_animation(self, dt):
         """Обновление анимации"""
@@ -53,134 +28,6 @@ class Player:
             self.animation_timer = 0
             self.animation_frame = (self.animation_frame + 1) % 4
     
-    def handle_input(self, input_handler, level, dt):
-        """Обработка ввода с поддержкой удержания клавиш"""
-        if not input_handler:
-            return
-        
-        # Проверяем нажатие клавиш (для первого движения)
-        direction = None
-        if input_handler.is_action_just_pressed('LEFT'):
-            direction = 'LEFT'
-            self.key_repeat_timer = 0
-        elif input_handler.is_action_just_pressed('RIGHT'):
-            direction = 'RIGHT'
-            self.key_repeat_timer = 0
-        elif input_handler.is_action_just_pressed('UP'):
-            direction = 'UP'
-            self.key_repeat_timer = 0
-        elif input_handler.is_action_just_pressed('DOWN'):
-            direction = 'DOWN'
-            self.key_repeat_timer = 0
-        
-        # Если клавиша не была только что нажата, проверяем удержание
-        if direction is None:
-            self.key_repeat_timer += dt
-            if self.key_repeat_timer >= self.key_repeat_delay:
-                self.key_repeat_timer = 0
-                
-                if input_handler.is_action_pressed('LEFT'):
-                    direction = 'LEFT'
-                elif input_handler.is_action_pressed('RIGHT'):
-                    direction = 'RIGHT'
-                elif input_handler.is_action_pressed('UP'):
-                    direction = 'UP'
-                elif input_handler.is_action_pressed('DOWN'):
-                    direction = 'DOWN'
-        
-        # Выполняем движение если есть направление
-        if direction:
-            self.try_move(direction, level)
-    
-    def try_move(self, direction, level):
-        """Попытка движения в указанном направлении"""
-        new_x, new_y = self.x, self.y
-        
-        if direction == 'LEFT':
-            new_x = self.x - self.tile_size
-        elif direction == 'RIGHT':
-            new_x = self.x + self.tile_size
-        elif direction == 'UP':
-            new_y = self.y - self.tile_size
-        elif direction == 'DOWN':
-            new_y = self.y + self.tile_size
-        
-        # Проверяем, можно ли двигаться
-        if self.can_move_to(new_x, new_y, level):
-            self.start_movement(new_x, new_y, level)
-    
-    def can_move_to(self, x, y, level):
-        """Проверка, можно ли двигаться в указанную позицию"""
-        tile_x = x // self.tile_size
-        tile_y = y // self.tile_size
-        
-        # Используем метод уровня для проверки
-        return level.can_player_move_to(tile_x, tile_y)
-    
-    def start_movement(self, target_x, target_y, level):
-        """Начало движения к цели"""
-        self.is_moving = True
-        self.move_timer = 0
-        self.start_pos = (self.x, self.y)
-        self.target_pos = (target_x, target_y)
-        
-        # Если плавная анимация выключена, сразу перемещаемся и обрабатываем взаимодействие
-        if not self.game_settings.smooth_movement:
-            self.x, self.y = self.target_pos
-            self.is_moving = False
-            self.handle_tile_interaction(level)
-    
-    def update_movement(self, dt, level):
-        """Обновление движения (только для плавной анимации)"""
-        self.move_timer += dt
-        progress = min(1.0, self.move_timer / self.move_duration)
-        
-        # Интерполяция позиции
-        start_x, start_y = self.start_pos
-        target_x, target_y = self.target_pos
-        
-        self.x = start_x + (target_x - start_x) * progress
-        self.y = start_y + (target_y - start_y) * progress
-        
-        # Завершаем движение
-        if progress >= 1.0:
-            self.x, self.y = self.target_pos
-            self.is_moving = False
-            
-            # Обрабатываем взаимодействие с тайлом
-            self.handle_tile_interaction(level)
-    
-    def handle_tile_interaction(self, level):
-        """Обработка взаимодействия с тайлом"""
-        tile_x = self.x // self.tile_size
-        tile_y = self.y // self.tile_size
-        
-        tile_type = level.get_tile(tile_x, tile_y)
-        
-        # Копаем землю
-        if tile_type == 'earth':
-            level.set_tile(tile_x, tile_y, 'empty')
-        
-        # Проверяем выход
-        if tile_type == 'exit':
-            # Можно войти в выход только если собраны все кристаллы
-            if level.get_crystals_count() == 0:
-                print("Level completed!")
-                # Здесь можно добавить переход на следующий уровень
-                return "LEVEL_COMPLETE"
-            else:
-                print(f"Collect all crystals first! {level.get_crystals_count()} left")
-        
-        # Собираем кристаллы и других существ
-        collected = level.collect_object(tile_x, tile_y)
-        if collected:
-            if collected == 'crystal':
-                self.crystals_collected += 1
-                print(f"Crystals collected: {self.crystals_collected}")
-                print(f"Crystals left: {level.get_crystals_count()}")
-            elif collected == 'worm':
-                print("Worm collected!")
-    
     def get_current_sprite(self):
         """Получение текущего спрайта для анимации"""
         hero_sprites = self.sprite_loader.get_sprite('hero')
@@ -188,11 +35,12 @@ class Player:
             return hero_sprites[self.animation_frame]
         return None
     
-    def render(self, screen, camera_x, camera_y):
+    def render(self, screen, camera_x, camera_y, alpha=1.0):
         """Отрисовка игрока"""
         # Вычисляем позицию на экране с учетом камеры
-        screen_x = self.x - camera_x
-        screen_y = self.y - camera_y
+        render_x, render_y = self.get_render_pos(alpha)
+        screen_x = math.floor(render_x - camera_x)
+        screen_y = math.floor(render_y - camera_y)
         
         # Получаем спрайт
         sprite = self.get_current_sprite()
@@ -0,0 +1,194 @@
+class PlayerState:
+    """Логика игрока (движение, копание, сбор) без отрисовки"""
+    
+    def __init__(self, x, y, game_settings):
+        self.x = x
+        self.y = y
+        # Позиция на предыдущем шаге симуляции (для интерполяции при отрисовке)
+        self.prev_x = x
+        self.prev_y = y
+        self.game_settings = game_settings
+        self.tile_size = 64
+        self.speed = 200  # пикселей в секунду
+        
+        # Состояние движения
+        self.is_moving = False
+        self.move_timer = 0
+        self.move_duration = 0.2  # время на один шаг
+        self.start_pos = (x, y)
+        self.target_pos = (x, y)
+        
+        # Для поддержки удержания клавиш
+        self.key_repeat_timer = 0
+        self.key_repeat_delay = 0.15  # задержка между повторами при удержании
+        
+        # Игровая статистика
+        self.crystals_collected = 0
+        
+        # Печатать игровые сообщения в консоль
+        self.verbose = True
+        
+    def update(self, dt, input_handler, level):
+        """Обновление игрока (возвращает "LEVEL_COMPLETE" при входе в открытый выход)"""
+        self.prev_x, self.prev_y = self.x, self.y
+        
+        # Если не двигаемся, проверяем ввод
+        if not self.is_moving:
+            return self.handle_input(input_handler, level, dt)
+        else:
+            # Продолжаем движение (только если включена плавная анимация)
+            if self.game_settings.smooth_movement:
+                return self.update_movement(dt, level)
+            else:
+                # При выключенной анимации сразу завершаем движение
+                self.x, self.y = self.target_pos
+                self.is_moving = False
+                return self.handle_tile_interaction(level)
+    
+    def handle_input(self, input_handler, level, dt):
+        """Обработка ввода с поддержкой удержания клавиш"""
+        if not input_handler:
+            return None
+        
+        # Проверяем нажатие клавиш (для первого движения)
+        direction = None
+        if input_handler.is_action_just_pressed('LEFT'):
+            direction = 'LEFT'
+            self.key_repeat_timer = 0
+        elif input_handler.is_action_just_pressed('RIGHT'):
+            direction = 'RIGHT'
+            self.key_repeat_timer = 0
+        elif input_handler.is_action_just_pressed('UP'):
+            direction = 'UP'
+            self.key_repeat_timer = 0
+        elif input_handler.is_action_just_pressed('DOWN'):
+            direction = 'DOWN'
+            self.key_repeat_timer = 0
+        
+        # Если клавиша не была только что нажата, проверяем удержание
+        if direction is None:
+            self.key_repeat_timer += dt
+            if self.key_repeat_timer >= self.key_repeat_delay:
+                self.key_repeat_timer = 0
+                
+                if input_handler.is_action_pressed('LEFT'):
+                    direction = 'LEFT'
+                elif input_handler.is_action_pressed('RIGHT'):
+                    direction = 'RIGHT'
+                elif input_handler.is_action_pressed('UP'):
+                    direction = 'UP'
+                elif input_handler.is_action_pressed('DOWN'):
+                    direction = 'DOWN'
+        
+        # Выполняем движение если есть направление
+        if direction:
+            return self.try_move(direction, level)
+        return None
+    
+    def try_move(self, direction, level):
+        """Попытка движения в указанном направлении"""
+        new_x, new_y = self.x, self.y
+        
+        if direction == 'LEFT':
+            new_x = self.x - self.tile_size
+        elif direction == 'RIGHT':
+            new_x = self.x + self.tile_size
+        elif direction == 'UP':
+            new_y = self.y - self.tile_size
+        elif direction == 'DOWN':
+            new_y = self.y + self.tile_size
+        
+        # Проверяем, можно ли двигаться
+        if self.can_move_to(new_x, new_y, level):
+            return self.start_movement(new_x, new_y, level)
+        return None
+    
+    def can_move_to(self, x, y, level):
+        """Проверка, можно ли двигаться в указанную позицию"""
+        tile_x = x // self.tile_size
+        tile_y = y // self.tile_size
+        
+        # Используем метод уровня для проверки
+        return level.can_player_move_to(tile_x, tile_y)
+    
+    def start_movement(self, target_x, target_y, level):
+        """Начало движения к цели"""
+        self.is_moving = True
+        self.move_timer = 0
+        self.start_pos = (self.x, self.y)
+        self.target_pos = (target_x, target_y)
+        # Звук копания - в момент шага, а не когда игрок дойдет до клетки
+        if level.get_tile(target_x // self.tile_size, target_y // self.tile_size) == 'earth':
+            level.emit_event('dig')
+        else:
+            level.emit_event('step')
+        
+        # Если плавная анимация выключена, сразу перемещаемся и обрабатываем взаимодействие
+        if not self.game_settings.smooth_movement:
+            self.x, self.y = self.target_pos
+            self.is_moving = False
+            return self.handle_tile_interaction(level)
+        return None
+    
+    def update_movement(self, dt, level):
+        """Обновление движения (только для плавной анимации)"""
+        self.move_timer += dt
+        progress = min(1.0, self.move_timer / self.move_duration)
+        
+        # Интерполяция позиции
+        start_x, start_y = self.start_pos
+        target_x, target_y = self.target_pos
+        
+        self.x = start_x + (target_x - start_x) * progress
+        self.y = start_y + (target_y - start_y) * progress
+        
+        # Завершаем движение
+        if progress >= 1.0:
+            self.x, self.y = self.target_pos
+            self.is_moving = False
+            
+            # Обрабатываем взаимодействие с тайлом
+            return self.handle_tile_interaction(level)
+        return None
+    
+    def handle_tile_interaction(self, level):
+        """Обработка взаимодействия с тайлом"""
+        tile_x = self.x // self.tile_size
+        tile_y = self.y // self.tile_size
+        
+        tile_type = level.get_tile(tile_x, tile_y)
+        
+        # Копаем землю
+        if tile_type == 'earth':
+            level.set_tile(tile_x, tile_y, 'empty')
+        
+        # Проверяем выход
+        if tile_type == 'exit':
+            # Можно войти в выход только если собраны все кристаллы
+            if level.get_crystals_count() == 0:
+                self.log("Level completed!")
+                level.emit_event('level_complete')
+                return "LEVEL_COMPLETE"
+            else:
+                self.log(f"Collect all crystals first! {level.get_crystals_count()} left")
+        
+        # Собираем кристаллы и других существ
+        collected = level.collect_object(tile_x, tile_y)
+        if collected:
+            if collected == 'crystal':
+                self.crystals_collected += 1
+                self.log(f"Crystals collected: {self.crystals_collected}")
+                self.log(f"Crystals left: {level.get_crystals_count()}")
+            elif collected == 'worm':
+                self.log("Worm collected!")
+        return None
+    
+    def log(self, message):
+        """Вывод игрового сообщения (отключается в безголовой симуляции)"""
+        if self.verbose:
+            print(message)
+    
+    def get_render_pos(self, alpha=1.0):
+        """Позиция для отрисовки между предыдущим и текущим шагом симуляции"""
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
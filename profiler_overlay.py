@@ -0,0 +1,81 @@
+import pygame
+from frame_profiler import PHASES
+
+# Бюджет кадра при 60 FPS (линия на графике)
+FRAME_BUDGET_MS = 1000 / 60
+
+
+class ProfilerOverlay:
+    """Оверлей FrameProfiler: время фаз (последнее, p50, p95, p99), счетчики и график времени кадра"""
+
+    def __init__(self, profiler, width=340, height=270, refresh_frames=10):
+        self.profiler = profiler
+        self.width = width
+        self.height = height
+        # Оверлей перерисовывается раз в refresh_frames кадров, чтобы не влиять на замер
+        self.refresh_frames = refresh_frames
+        self.frames_until_refresh = 0
+        self.font = pygame.font.Font(None, 18)
+        self.surface = pygame.Surface((width, height))
+        self.surface.set_alpha(210)
+        self.graph_rect = pygame.Rect(8, height - 68, width - 16, 60)
+
+    def invalidate(self):
+        """Перерисовать оверлей в следующем кадре"""
+        self.frames_until_refresh = 0
+
+    def render(self, screen):
+        """Отрисовка оверлея в правом нижнем углу экрана"""
+        if self.frames_until_refresh <= 0:
+            self.redraw()
+            self.frames_until_refresh = self.refresh_frames
+        self.frames_until_refresh -= 1
+        screen_width, screen_height = screen.get_size()
+        screen.blit(self.surface, (screen_width - self.width - 10, screen_height - self.height - 10))
+
+    def redraw(self):
+        """Перерисовка таблицы и графика по последним кадрам"""
+        surface = self.surface
+        surface.fill((16, 16, 24))
+        pygame.draw.rect(surface, (96, 96, 96), surface.get_rect(), 1)
+
+        labels = dict(PHASES)
+        labels['frame'] = 'frame'
+        y = 6
+        self.draw_row(surface, y, ("ms", "last", "p50", "p95", "p99"), (255, 255, 0))
+        for name, last, p50, p95, p99 in self.profiler.get_stats():
+            y += 16
+            self.draw_row(surface, y, (labels[name], f"{last:.2f}", f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}"),
+                          (255, 255, 255) if name == 'frame' else (200, 200, 200))
+
+        counts = "  ".join(f"{name}: {value}" for name, value in self.profiler.get_last_counts().items())
+        y += 20
+        surface.blit(self.font.render(counts, True, (160, 220, 160)), (8, y))
+        surface.blit(self.font.render("F3 - hide   F4 - CSV", True, (128, 128, 128)), (8, y + 16))
+
+        self.draw_graph(surface)
+
+    def draw_row(self, surface, y, cells, color):
+        """Строка таблицы: подпись фазы и четыре числа по правому краю колонок"""
+        surface.blit(self.font.render(cells[0], True, color), (8, y))
+        for index, cell in enumerate(cells[1:]):
+            text = self.font.render(cell, True, color)
+            surface.blit(text, text.get_rect(topright=(150 + (index + 1) * 46, y)))
+
+    def draw_graph(self, surface):
+        """График времени кадра: столбец на кадр, красные - дольше бюджета кадра"""
+        rect = self.graph_rect
+        pygame.draw.rect(surface, (32, 32, 40), rect)
+        frame_times = self.profiler.get_frame_times()[-rect.width:]
+        if not frame_times:
+            return
+        # Масштаб - не меньше двух бюджетов кадра, чтобы линия бюджета была видна
+        scale = rect.height / max(FRAME_BUDGET_MS * 2, max(frame_times))
+        x = rect.right - len(frame_times)
+        for frame_ms in frame_times:
+            bar_height = max(1, int(frame_ms * scale))
+            color = (220, 60, 60) if frame_ms > FRAME_BUDGET_MS else (60, 200, 90)
+            pygame.draw.line(surface, color, (x, rect.bottom - 1), (x, rect.bottom - bar_height))
+            x += 1
+        budget_y = rect.bottom - int(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(surface, (255, 255, 0), (rect.left, budget_y), (rect.right - 1, budget_y))
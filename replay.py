@@ -0,0 +1,134 @@
+import argparse
+import json
+import time
+from game_settings import GameSettings
+from level_data import LevelData
+from simulation import Simulation, RECORDED_ACTIONS
+
+# Версия формата записи: записи других версий не воспроизводятся
+REPLAY_VERSION = 1
+
+
+class Recording:
+    """Запись сессии: параметры уровня с seed и действия на каждом шаге симуляции"""
+
+    def __init__(self, level_info, smooth_movement=True):
+        self.level_info = level_info
+        self.smooth_movement = smooth_movement
+        # Одинаковые шаги подряд сжаты: [повторов, dt, нажатые действия, только что нажатые]
+        self.runs = []
+        self.final_digest = None
+
+    @classmethod
+    def start(cls, simulation):
+        """Начало записи симуляции (ввод записывается в Simulation.update)"""
+        level = simulation.level
+        recording = cls({
+            'level_number': level.level_number,
+            'width': level.width,
+            'height': level.height,
+            'seed': level.seed,
+            'difficulty': level.difficulty,
+            'chunk_size': level.chunk_size,
+            'level_data': level.from_level_data
+        }, simulation.game_settings.smooth_movement)
+        simulation.recorder = recording
+        return recording
+
+    def record_tick(self, dt, input_handler):
+        """Запись ввода одного шага симуляции"""
+        pressed = [action for action in RECORDED_ACTIONS if input_handler.is_action_pressed(action)]
+        just_pressed = [action for action in RECORDED_ACTIONS if input_handler.is_action_just_pressed(action)]
+        if self.runs:
+            last = self.runs[-1]
+            if last[1] == dt and last[2] == pressed and last[3] == just_pressed:
+                last[0] += 1
+                return
+        self.runs.append([1, dt, pressed, just_pressed])
+
+    def finish(self, simulation):
+        """Окончание записи: запоминаем итоговое состояние для сверки при воспроизведении"""
+        self.final_digest = simulation.get_state_digest()
+        simulation.recorder = None
+
+    def get_tick_count(self):
+        """Количество записанных шагов"""
+        return sum(run[0] for run in self.runs)
+
+    def ticks(self):
+        """Шаги записи: (dt, нажатые действия, только что нажатые)"""
+        for count, dt, pressed, just_pressed in self.runs:
+            for _ in range(count):
+                yield dt, pressed, just_pressed
+
+    def save(self, path):
+        """Сохранение записи в JSON"""
+        with open(path, 'w') as f:
+            json.dump({
+                'version': REPLAY_VERSION,
+                'level': self.level_info,
+                'smooth_movement': self.smooth_movement,
+                'final_digest': self.final_digest,
+                'runs': self.runs
+            }, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """Загрузка записи из JSON"""
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия записи {data.get('version')} "
+                             f"(ожидается {REPLAY_VERSION})")
+        recording = cls(data['level'], data['smooth_movement'])
+        recording.runs = data['runs']
+        recording.final_digest = data['final_digest']
+        return recording
+
+
+def create_simulation(recording):
+    """Безголовая симуляция того же уровня, что и в записи"""
+    info = recording.level_info
+    game_settings = GameSettings()
+    game_settings.smooth_movement = recording.smooth_movement
+    level_data = LevelData.get_level(info['level_number']) if info['level_data'] else None
+    return Simulation.create(info['level_number'], info['width'], info['height'], game_settings,
+                             level_data, info['chunk_size'], info['seed'], info['difficulty'])
+
+
+def replay(recording):
+    """Воспроизведение записи без отрисовки и ограничения кадров, возвращает симуляцию"""
+    simulation = create_simulation(recording)
+    action_input = simulation.input
+    for dt, pressed, just_pressed in recording.ticks():
+        action_input.set_state(pressed, just_pressed)
+        simulation.update(dt, action_input)
+        action_input.update()
+    return simulation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение записанной сессии")
+    parser.add_argument('recording')
+    parser.add_argument('--repeat', type=int, default=1, help="сколько раз воспроизвести (для замеров)")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        simulation = replay(recording)
+    elapsed = time.perf_counter() - start
+
+    ticks = recording.get_tick_count() * args.repeat
+    print(f"Шагов: {ticks}, время: {elapsed:.3f} с, {ticks / elapsed if elapsed else 0:.0f} шагов/с")
+    print(f"Результат: {simulation.result or 'уровень не завершен'}")
+    if recording.final_digest:
+        if simulation.get_state_digest() == recording.final_digest:
+            print("Итоговое состояние совпадает с записью")
+        else:
+            print("ВНИМАНИЕ: итоговое состояние отличается от записи")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,10 @@ class SettingsScreen:
         self.selected_item = 0
         self.menu_items = ['Sound Volume', 'Music Volume', 'Movement Mode', 'Back']
         
+        # Состояние прошлого кадра для режима dirty rects
+        self.needs_full_redraw = True
+        self.last_state = None
+        
     def handle_event(self, event):
         """Обработка событий"""
         if event.type == pygame.KEYDOWN:
@@ -50,6 +54,21 @@ class SettingsScreen:
         elif self.selected_item == 2:  # Movement Mode
             self.game_settings.toggle_smooth_movement()
     
+    def invalidate(self):
+        """Следующий кадр в режиме dirty rects будет отрисован полностью"""
+        self.needs_full_redraw = True
+    
+    def render_dirty(self, screen):
+        """Экран статичен: перерисовываем его только после изменений"""
+        state = (self.selected_item, self.sound_manager.sound_volume,
+                 self.sound_manager.music_volume, self.game_settings.smooth_movement)
+        if not self.needs_full_redraw and state == self.last_state:
+            return []
+        self.render(screen)
+        self.needs_full_redraw = False
+        self.last_state = state
+        return [screen.get_rect()]
+    
     def update(self, dt, input_handler):
         """Обновление экрана настроек"""
         pass
@@ -0,0 +1,128 @@
+import hashlib
+import config
+from game_settings import GameSettings
+from level_state import LevelState
+from player_state import PlayerState
+
+
+# Действия, которые записываются в повторы (см. replay.py)
+RECORDED_ACTIONS = ('UP', 'DOWN', 'LEFT', 'RIGHT', 'ACTION')
+
+
+class ActionInput:
+    """Ввод в виде набора удерживаемых действий (замена InputHandler без pygame)"""
+    
+    def __init__(self):
+        self.actions_pressed = set()
+        self.actions_just_pressed = set()
+    
+    def set_actions(self, actions):
+        """Установка действий, удерживаемых на этом шаге"""
+        actions = set(actions)
+        self.actions_just_pressed = actions - self.actions_pressed
+        self.actions_pressed = actions
+    
+    def set_state(self, actions_pressed, actions_just_pressed):
+        """Точное состояние ввода на шаге (для воспроизведения записи)"""
+        self.actions_pressed = set(actions_pressed)
+        self.actions_just_pressed = set(actions_just_pressed)
+    
+    def update(self):
+        """Очистка временных состояний (как InputHandler.update)"""
+        self.actions_just_pressed = set()
+    
+    def is_action_pressed(self, action):
+        """Проверка, удерживается ли действие"""
+        return action in self.actions_pressed
+    
+    def is_action_just_pressed(self, action):
+        """Проверка, было ли действие только что нажато"""
+        return action in self.actions_just_pressed
+
+
+class Simulation:
+    """Игровая логика уровня без pygame: шаг симуляции по набору действий"""
+    
+    def __init__(self, level, player, game_settings):
+        self.level = level
+        self.player = player
+        self.game_settings = game_settings
+        self.input = ActionInput()
+        
+        # Состояние симуляции
+        self.steps = 0
+        self.time = 0.0
+        self.result = None
+        
+        # Запись ввода (replay.Recording), если идет запись
+        self.recorder = None
+    
+    @classmethod
+    def create(cls, level_number=1, width=15, height=12, game_settings=None, level_data=None,
+               chunk_size=None, seed=None, difficulty=0):
+        """Создание безголовой симуляции нового уровня (случайного или из LevelData)"""
+        if game_settings is None:
+            game_settings = GameSettings()
+        level = LevelState(game_settings, level_number, width, height, level_data, chunk_size, seed, difficulty)
+        start_x, start_y = level.get_player_start_position()
+        player = PlayerState(start_x * level.tile_size, start_y * level.tile_size, game_settings)
+        player.verbose = False
+        return cls(level, player, game_settings)
+    
+    def get_player_tile(self):
+        """Позиция игрока в тайлах"""
+        return (self.player.x // self.level.tile_size, self.player.y // self.level.tile_size)
+    
+    def update(self, dt, input_handler):
+        """Шаг симуляции с произвольным обработчиком ввода (возвращает результат уровня)"""
+        if self.recorder is not None:
+            self.recorder.record_tick(dt, input_handler)
+        # События этого шага (звуки проигрывает экран игры после шага)
+        self.level.events.clear()
+        
+        # Обновляем игрока
+        result = self.player.update(dt, input_handler, self.level)
+        
+        self.steps += 1
+        self.time += dt
+        
+        # Проверяем завершение уровня
+        if result == "LEVEL_COMPLETE":
+            self.result = result
+            return result
+        
+        # Обновляем уровень с позицией игрока
+        player_tile_x, player_tile_y = self.get_player_tile()
+        self.level.update(dt, player_tile_x, player_tile_y)
+        return None
+    
+    def step(self, actions=(), dt=None):
+        """Шаг симуляции: actions - действия ('LEFT', 'RIGHT', 'UP', 'DOWN'), удерживаемые на этом шаге"""
+        if dt is None:
+            dt = 1.0 / config.SIMULATION_RATE
+        self.input.set_actions(actions)
+        result = self.update(dt, self.input)
+        self.input.update()
+        return result
+    
+    def is_finished(self):
+        """Завершен ли уровень"""
+        return self.result is not None
+    
+    def get_state_digest(self):
+        """Контрольная сумма состояния (карта, объекты, игрок) для сверки повторов"""
+        digest = hashlib.sha1()
+        tiles = self.level.tiles
+        if self.level.chunk_size:
+            for key in sorted(tiles.chunks):
+                digest.update(repr(key).encode())
+                digest.update(tiles.chunks[key])
+        else:
+            digest.update(tiles.data)
+        for obj in self.level.game_objects:
+            # Координаты в хранилище - float; целые пишем как раньше, без ".0"
+            x = int(obj.x) if obj.x.is_integer() else obj.x
+            y = int(obj.y) if obj.y.is_integer() else obj.y
+            digest.update(f"{obj.object_type},{x},{y},{obj.active};".encode())
+        digest.update(f"{self.player.x},{self.player.y},{self.steps},{self.result}".encode())
+        return digest.hexdigest()
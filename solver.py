@@ -0,0 +1,519 @@
+import argparse
+import hashlib
+import heapq
+import json
+import multiprocessing
+import re
+import time
+from game_settings import GameSettings
+from level_data import LevelData
+from level_state import LevelState
+from player_state import PlayerState
+from simulation import Simulation
+from tile_grid import TileGrid, TILE_CODES, EMPTY, EARTH, BRICK_WALL, STONE, EXIT
+
+# Состояние решателя - карта в байтах, где объекты записаны кодом тайла с флагом OBJECT
+OBJECT = 0x40
+STONE_OBJECT = OBJECT | TILE_CODES['stone']
+CRYSTAL_OBJECT = OBJECT | TILE_CODES['crystal']
+WORM_OBJECT = OBJECT | TILE_CODES['worm']
+FIRE_OBJECT = OBJECT | TILE_CODES['fire']
+# Код клетки с объектом -> тип объекта (для загрузки состояния в симуляцию)
+OBJECT_CODES = {OBJECT | TILE_CODES[name]: name for name in ('stone', 'fire', 'crystal', 'worm', 'bubble')}
+OBJECT_CELLS = re.compile(b'[' + re.escape(bytes(OBJECT_CODES)) + b']')
+
+# Правила из LevelState: куда может войти игрок, что падает, что скользит и с чего
+PLAYER_PASSABLE = {EMPTY, EARTH, EXIT, CRYSTAL_OBJECT, WORM_OBJECT, FIRE_OBJECT}
+PLAYER_COLLECTS = {EARTH, CRYSTAL_OBJECT, WORM_OBJECT}
+FALLING_CELLS = re.compile(b'[' + re.escape(bytes([STONE_OBJECT, CRYSTAL_OBJECT, WORM_OBJECT])) + b']')
+FALLING_CODES = {STONE_OBJECT, CRYSTAL_OBJECT, WORM_OBJECT}
+SLIDING = {STONE_OBJECT, CRYSTAL_OBJECT}
+SLIDE_SURFACES = {STONE, BRICK_WALL, STONE_OBJECT, CRYSTAL_OBJECT}
+CRYSTAL_BYTE = bytes([CRYSTAL_OBJECT])
+# Клетки, которые никогда не сдвигаются и не пропускают игрока
+STATIC_CODES = {BRICK_WALL, STONE, OBJECT | TILE_CODES['bubble']}
+EARTH_BYTE = bytes([EARTH])
+
+# Ходы: влево, вправо, вверх, вниз и ожидание (дать объектам упасть)
+MOVES = 'LRUDW'
+MOVE_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1), (0, 0))
+# Действия Simulation для ходов (ожидание - шаг без нажатий)
+MOVE_ACTIONS = (('LEFT',), ('RIGHT',), ('UP',), ('DOWN',), ())
+WAIT = MOVES.index('W')
+
+DEFAULT_MAX_STATES = 200000
+
+# Жадный поиск: вес оценки и штраф за каждый несобранный кристалл
+GREEDY_WEIGHT = 3
+CRYSTAL_WEIGHT = 6
+
+
+def encode_grid(level):
+    """Карта уровня с объектами, записанными в клетки"""
+    grid = bytearray(level.tiles.data)
+    for obj in level.game_objects:
+        if obj.active:
+            tile_x, tile_y = obj.get_tile_pos()
+            grid[tile_y * level.width + tile_x] = OBJECT | TILE_CODES[obj.object_type]
+    return bytes(grid)
+
+
+def encode_level(level):
+    """Начальное состояние решателя из уровня: (карта с объектами, клетка игрока)"""
+    start_x, start_y = level.get_player_start_position()
+    return encode_grid(level), start_y * level.width + start_x
+
+
+def get_start_state(level):
+    """Состояние нового уровня для симуляции: (карта, игрок, клетки очереди гравитации, прошлая клетка игрока)
+
+    Порядок очереди гравитации определяет, какой из объектов займет клетку
+    первым, поэтому он сохраняется вместе с картой.
+    """
+    grid, player = encode_level(level)
+    store = level.objects
+    awake_cells = []
+    for object_id in level.awake_objects:
+        tile_x, tile_y = store.get_tile_pos(object_id)
+        awake_cells.append(tile_y * level.width + tile_x)
+    last_player = None
+    if level.last_player_tile is not None:
+        last_player = level.last_player_tile[1] * level.width + level.last_player_tile[0]
+    return grid, player, awake_cells, last_player
+
+
+def create_simulation(width, height):
+    """Симуляция для ходов решателя: движение мгновенное, ход - один шаг длиной в тик гравитации"""
+    game_settings = GameSettings()
+    game_settings.smooth_movement = False
+    level = LevelState(game_settings, 1, level_data={'tiles': TileGrid(width, height), 'objects': [],
+                                                     'player_start': (0, 0)})
+    return Simulation(level, PlayerState(0, 0, game_settings), game_settings)
+
+
+def load_state(simulation, grid, player, awake_cells=(), last_player=None):
+    """Загрузка состояния решателя в симуляцию (объекты из awake_cells ждут проверки гравитации)"""
+    level = simulation.level
+    width = level.width
+    tiles = bytearray(grid)
+    objects = []
+    for match in OBJECT_CELLS.finditer(grid):
+        index = match.start()
+        y, x = divmod(index, width)
+        objects.append((x, y, OBJECT_CODES[grid[index]]))
+        tiles[index] = EMPTY
+    level.tiles = TileGrid(width, level.height, data=tiles)
+    level.clear_objects()
+    level.place_objects(objects)
+    level.awake_objects = {level.object_grid[index]: None for index in awake_cells}
+    if last_player is not None:
+        level.last_player_tile = (last_player % width, last_player // width)
+    level.gravity_timer = 0
+
+    tile_size = level.tile_size
+    simulation.player = PlayerState(player % width * tile_size, player // width * tile_size,
+                                    simulation.game_settings)
+    simulation.player.verbose = False
+    simulation.input.set_actions(())
+    simulation.result = None
+
+
+def play_move(simulation, move):
+    """Ход в симуляции: нажатие (W - без нажатий) и тик гравитации; True - уровень пройден"""
+    return simulation.step(MOVE_ACTIONS[move], simulation.level.gravity_interval) == 'LEVEL_COMPLETE'
+
+
+def read_state(simulation):
+    """Состояние решателя из симуляции: (карта с объектами, клетка игрока)"""
+    level = simulation.level
+    player_x, player_y = simulation.get_player_tile()
+    return encode_grid(level), int(player_y) * level.width + int(player_x)
+
+
+def play_event(simulation, grid, player, move):
+    """Ход, который тревожит объекты, по правилам игры: (ходы, карта, игрок, пройден)
+
+    Ход выполняет Simulation, затем игрок ждет (ходы W), пока очередь гравитации
+    не опустеет: после этого все объекты устойчивы, и от порядка пробуждения
+    в прошлом ничего не зависит.
+    """
+    load_state(simulation, grid, player, last_player=player)
+    path = MOVES[move]
+    completed = play_move(simulation, move)
+    if not completed:
+        while simulation.level.awake_objects:
+            play_move(simulation, WAIT)
+            path += 'W'
+    new_grid, new_player = read_state(simulation)
+    return path, new_grid, new_player, completed
+
+
+def verify_solution(simulation, start_state, solution):
+    """Проигрывание решения в Simulation с начального состояния: проходит ли оно уровень"""
+    load_state(simulation, *start_state)
+    for number, move in enumerate(solution, 1):
+        if play_move(simulation, MOVES.index(move)):
+            return number == len(solution)
+    return False
+
+
+def get_object_target(grid, index, player, width, height):
+    """Клетка, куда объект сдвинется на этом тике (правила LevelState.get_object_fall_direction), или None"""
+    code = grid[index]
+    y, x = divmod(index, width)
+    if y + 1 >= height:
+        below_code = BRICK_WALL  # За границами - стена
+    else:
+        below = index + width
+        below_code = grid[below]
+        if below_code == EMPTY and below != player:
+            return below
+
+    # Скольжение (сначала вправо, потом влево) - только для камней и кристаллов
+    if code in SLIDING and below_code in SLIDE_SURFACES and y + 1 < height:
+        for dx in (1, -1):
+            if not 0 <= x + dx < width:
+                continue
+            side = index + dx
+            if (grid[side] == EMPTY and grid[side + width] == EMPTY and
+                    side != player and side + width != player):
+                return side
+    return None
+
+
+def disturbs_objects(grid, player, changed_cells, width, height):
+    """Может ли сдвинуться объект рядом с изменившимися клетками (как LevelState.wake_around)"""
+    for cell in changed_cells:
+        cell_y, cell_x = divmod(cell, width)
+        for y in (cell_y - 1, cell_y):
+            if 0 <= y < height:
+                for x in (cell_x - 1, cell_x, cell_x + 1):
+                    if 0 <= x < width:
+                        index = y * width + x
+                        if (grid[index] in FALLING_CODES and
+                                get_object_target(grid, index, player, width, height) is not None):
+                            return True
+    return False
+
+
+def expand(simulation, grid, player, width, height, stats):
+    """Макроходы из устойчивого состояния: (путь, карта, игрок, пройден)
+
+    Пока игрок только ходит и копает землю, не тревожа объекты, мир не меняется,
+    поэтому такие ходы перебираются поиском в ширину по клеткам игрока. Состояние
+    поиска создается только на событии: сбор объекта, начало падения или выход.
+    Событие выполняет Simulation (см. play_event), после него игрок ждет (ходы W),
+    пока объекты не улягутся.
+    """
+    visited = {player: (grid, '')}
+    queue = [player]
+    for position in queue:
+        position_grid, path = visited[position]
+        px, py = position % width, position // width
+        for move in range(4):
+            dx, dy = MOVE_OFFSETS[move]
+            x, y = px + dx, py + dy
+            if not (0 <= x < width and 0 <= y < height):
+                continue
+            target = y * width + x
+            code = position_grid[target]
+            if code not in PLAYER_PASSABLE:
+                continue
+            stats['steps'] += 1
+
+            quiet = code in (EMPTY, EARTH, EXIT, FIRE_OBJECT)
+            if quiet:
+                if code == EXIT and CRYSTAL_BYTE not in position_grid:
+                    quiet = False
+                elif target in visited:
+                    continue
+                else:
+                    new_grid = position_grid
+                    if code == EARTH:
+                        new_grid = bytearray(position_grid)
+                        new_grid[target] = EMPTY
+                        new_grid = bytes(new_grid)
+                    quiet = not disturbs_objects(new_grid, target, (position, target), width, height)
+            if quiet:
+                visited[target] = (new_grid, path + MOVES[move])
+                queue.append(target)
+            else:
+                event_path, new_grid, new_player, completed = play_event(simulation, position_grid, position, move)
+                yield path + event_path, new_grid, new_player, completed
+
+
+def clear_unreachable_earth(grid, width, height):
+    """Земля вне досягаемости падающих объектов заменяется пустотой
+
+    Объект движется только вниз и не дальше чем на клетку в сторону за клетку
+    падения, поэтому на него влияют лишь клетки в расширяющемся вниз конусе.
+    Для остальной земли неважно, выкопана она или нет (игрок проходит ее
+    так же), и такие состояния сливаются в одно (см. state_key).
+    """
+    full = (1 << width) - 1
+    reach = 0
+    cleared = None
+    for y in range(height):
+        row = y * width
+        objects = 0
+        for match in FALLING_CELLS.finditer(grid, row, row + width):
+            objects |= 1 << (match.start() - row)
+        reach |= objects
+        reach = (reach | reach << 1 | reach >> 1) & full
+        if reach == full:
+            break
+        index = grid.find(EARTH_BYTE, row, row + width)
+        while index != -1:
+            if not reach >> (index - row) & 1:
+                if cleared is None:
+                    cleared = bytearray(grid)
+                cleared[index] = EMPTY
+            index = grid.find(EARTH_BYTE, index + 1, row + width)
+    return grid if cleared is None else bytes(cleared)
+
+
+def state_key(grid, player, width, height):
+    """Компактный ключ состояния: 64-битный хэш карты без недосягаемой земли и позиции игрока"""
+    grid = clear_unreachable_earth(grid, width, height)
+    digest = hashlib.blake2b(grid, digest_size=8, key=player.to_bytes(4, 'little'))
+    return int.from_bytes(digest.digest(), 'little')
+
+
+def make_heuristic(grid, width):
+    """Нижняя оценка числа ходов: до выхода и до самого далекого кристалла
+
+    Кристалл может сдвинуться навстречу игроку за тот же ход, поэтому
+    расстояние до него делится на два.
+    """
+    exits = [(index % width, index // width) for index in range(len(grid)) if grid[index] == EXIT]
+
+    def heuristic(state_grid, player):
+        px, py = player % width, player // width
+        estimate = min(abs(px - ex) + abs(py - ey) for ex, ey in exits)
+        index = state_grid.find(CRYSTAL_BYTE)
+        while index != -1:
+            distance = abs(px - index % width) + abs(py - index // width)
+            estimate = max(estimate, (distance + 1) // 2)
+            index = state_grid.find(CRYSTAL_BYTE, index + 1)
+        return estimate
+
+    return heuristic if exits else None
+
+
+def check_reachable(grid, player, width, height):
+    """Быстрая проверка без поиска: причина, по которой уровень точно непроходим, или None
+
+    Стены, камни-тайлы и пузыри никогда не сдвигаются, поэтому кристалл или
+    выход за ними недостижим при любых ходах.
+    """
+    if EXIT not in grid:
+        return "на карте нет выхода"
+    reached = {player}
+    queue = [player]
+    for index in queue:
+        y, x = divmod(index, width)
+        for dx, dy in MOVE_OFFSETS[:4]:
+            if 0 <= x + dx < width and 0 <= y + dy < height:
+                target = index + dy * width + dx
+                if target not in reached and grid[target] not in STATIC_CODES:
+                    reached.add(target)
+                    queue.append(target)
+    if not any(grid[index] == EXIT for index in reached):
+        return "выход отгорожен стенами"
+    crystals = grid.count(CRYSTAL_BYTE)
+    if sum(1 for index in reached if grid[index] == CRYSTAL_OBJECT) < crystals:
+        return "кристалл отгорожен стенами"
+    return None
+
+
+def search(simulation, grid, player, width, height, heuristic, stats, max_states, weight=1, bound=None):
+    """Поиск по макроходам с приоритетом стоимость + weight * оценка
+
+    При weight=1 это A*, и первое найденное решение кратчайшее. Ветви, которые
+    даже по нижней оценке не короче bound, отсекаются. Возвращает (решение,
+    перебрано ли все пространство состояний).
+    """
+    # Для каждого состояния храним только ключ родителя и ходы от него
+    start_key = state_key(grid, player, width, height)
+    parents = {start_key: None}
+    costs = {start_key: 0}
+    generated = 1
+    # Записи очереди: (приоритет, стоимость, порядковый номер, ключ, карта, игрок)
+    frontier = [(weight * heuristic(grid, player), 0, 0, start_key, grid, player)]
+    while frontier:
+        _, cost, _, key, grid, player = heapq.heappop(frontier)
+        if grid is None:
+            return reconstruct(parents, key), False
+        if cost > costs[key]:
+            continue  # Устаревшая запись - состояние уже достигнуто короче
+        stats['expanded'] += 1
+
+        for path, new_grid, new_player, completed in expand(simulation, grid, player, width, height, stats):
+            new_cost = cost + len(path)
+            estimate = 0 if completed else heuristic(new_grid, new_player)
+            if bound is not None and new_cost + estimate >= bound:
+                continue
+            # Выход - цель поиска; она считается найденной, когда дойдет очередь
+            new_key = ('exit', new_player) if completed else state_key(new_grid, new_player, width, height)
+            if new_key in costs:
+                # Жадный поиск не переоткрывает состояния: ему важна скорость, а не длина
+                if weight != 1 or costs[new_key] <= new_cost:
+                    continue
+            else:
+                generated += 1
+                stats['generated'] += 1
+            costs[new_key] = new_cost
+            parents[new_key] = (key, path)
+            if completed:
+                entry = (new_cost, new_cost, generated, new_key, None, new_player)
+            else:
+                entry = (new_cost + weight * estimate, new_cost, generated, new_key, new_grid, new_player)
+            heapq.heappush(frontier, entry)
+        stats['max_frontier'] = max(stats['max_frontier'], len(frontier))
+        if generated >= max_states:
+            return None, False
+    return None, True
+
+
+def solve(level, max_states=DEFAULT_MAX_STATES, optimize=True):
+    """Проверка проходимости уровня и поиск кратчайшего решения
+
+    Сначала быстрая проверка стен, затем жадный поиск (находит решение или
+    доказывает, что его нет), затем A* с отсечением по найденному решению
+    (optimize=False - без этого шага, только проверка проходимости).
+    Возвращает словарь: status ('solvable', 'unsolvable' или 'unknown' при
+    превышении max_states), solution (строка ходов LRUDW, W - ожидание),
+    optimal (доказано ли, что решение кратчайшее), reason для непроходимых
+    уровней и статистику поиска. Кратчайшее - среди решений, в которых игрок
+    между событиями идет кратчайшим путем и ждет, пока объекты улягутся.
+    
+    Ход решения - один шаг Simulation длиной в тик гравитации при мгновенном
+    движении (см. play_move). Найденное решение проигрывается в Simulation
+    с начала уровня; если оно не проходит уровень, статус - 'unknown'.
+    """
+    start_time = time.perf_counter()
+    width, height = level.width, level.height
+    start_state = get_start_state(level)
+    grid, player = start_state[:2]
+    stats = {'expanded': 0, 'generated': 0, 'steps': 0, 'max_frontier': 1}
+
+    def result(status, solution=None, optimal=False, reason=None):
+        stats['time'] = time.perf_counter() - start_time
+        return {'status': status, 'solution': solution,
+                'moves': len(solution) if solution is not None else None,
+                'optimal': optimal, 'reason': reason, **stats}
+
+    reason = check_reachable(grid, player, width, height)
+    if reason:
+        return result('unsolvable', reason=reason)
+
+    # В начале уровня объекты падают на свои места, пока игрок ждет
+    simulation = create_simulation(width, height)
+    load_state(simulation, *start_state)
+    start_path = ''
+    while simulation.level.awake_objects:
+        play_move(simulation, WAIT)
+        start_path += 'W'
+    grid, player = read_state(simulation)
+    heuristic = make_heuristic(grid, width)
+
+    # Жадный поиск: оценка усилена числом оставшихся кристаллов
+    def greedy_heuristic(state_grid, state_player):
+        return heuristic(state_grid, state_player) + CRYSTAL_WEIGHT * state_grid.count(CRYSTAL_BYTE)
+
+    solution, exhausted = search(simulation, grid, player, width, height, greedy_heuristic, stats,
+                                 max_states, GREEDY_WEIGHT)
+    if solution is None:
+        if exhausted:
+            return result('unsolvable', reason="перебраны все состояния")
+        return result('unknown')
+    solution = start_path + solution
+    optimal = False
+    if optimize:
+        # A* ищет только решения короче найденного; если их нет, найденное кратчайшее
+        shorter, exhausted = search(simulation, grid, player, width, height, heuristic, stats,
+                                    max(max_states - stats['generated'], 1),
+                                    bound=len(solution) - len(start_path))
+        if shorter is not None:
+            solution, optimal = start_path + shorter, True
+        else:
+            optimal = exhausted
+
+    if not verify_solution(simulation, start_state, solution):
+        return result('unknown', reason="решение не проходит уровень в Simulation")
+    return result('solvable', solution, optimal)
+
+
+def reconstruct(parents, key):
+    """Восстановление последовательности ходов по цепочке родителей"""
+    legs = []
+    while parents[key] is not None:
+        key, path = parents[key]
+        legs.append(path)
+    return ''.join(reversed(legs))
+
+
+def solve_job(job):
+    """Решение одного задания пула: ('seed', seed, ширина, высота, ...) или ('level', номер, ...)"""
+    kind, value, width, height, max_states, optimize = job
+    if kind == 'seed':
+        level = LevelState(None, 1, width, height, seed=value)
+    else:
+        level = LevelState(None, value, level_data=LevelData.get_level(value))
+    return {'job': kind, 'id': value, **solve(level, max_states, optimize)}
+
+
+def validate(jobs, processes=None, max_states=DEFAULT_MAX_STATES, optimize=True, chunksize=4):
+    """Проверка пачки уровней на всех ядрах; результаты выдаются по мере готовности"""
+    jobs = [(kind, value, width, height, max_states, optimize) for kind, value, width, height in jobs]
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(solve_job, jobs, chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка проходимости уровней")
+    parser.add_argument('--processes', type=int, default=None, help="по умолчанию - все ядра")
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES)
+    parser.add_argument('--fast', action='store_true', help="только проходимость, без поиска кратчайшего решения")
+    parser.add_argument('--output', help="файл JSON Lines с результатами")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seeds_parser = commands.add_parser('seeds', help="случайные уровни с seed из диапазона")
+    seeds_parser.add_argument('start', type=int)
+    seeds_parser.add_argument('stop', type=int)
+    seeds_parser.add_argument('--width', type=int, default=15)
+    seeds_parser.add_argument('--height', type=int, default=12)
+
+    levels_parser = commands.add_parser('levels', help="уровни LevelData (по умолчанию все)")
+    levels_parser.add_argument('numbers', type=int, nargs='*')
+
+    args = parser.parse_args()
+    if args.command == 'seeds':
+        jobs = [('seed', seed, args.width, args.height) for seed in range(args.start, args.stop)]
+    else:
+        numbers = args.numbers or range(1, LevelData.get_level_count() + 1)
+        jobs = [('level', number, None, None) for number in numbers]
+
+    start = time.perf_counter()
+    counts = {'solvable': 0, 'unsolvable': 0, 'unknown': 0}
+    output = open(args.output, 'w') if args.output else None
+    try:
+        for result in validate(jobs, args.processes, args.max_states, not args.fast):
+            counts[result['status']] += 1
+            if output:
+                output.write(json.dumps(result) + '\n')
+            else:
+                note = result['reason'] or ('кратчайшее' if result['optimal'] else '')
+                print(f"{result['job']} {result['id']}: {result['status']} {note}"
+                      f" ходов={result['moves']} состояний={result['generated']} {result['time']:.2f} с")
+    finally:
+        if output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Уровней: {len(jobs)} за {elapsed:.1f} с - проходимы: {counts['solvable']}, "
+          f"непроходимы: {counts['unsolvable']}, не решены за {args.max_states} состояний: {counts['unknown']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,265 @@
-import pygame
 import os
+from collections import deque
+import pygame
+import config
+
+# Звуки игровых событий: событие -> (файл в assets, приоритет, максимум голосов, громкость)
+# Более важный звук может занять канал менее важного, если свободных каналов нет
+SOUND_MANIFEST = {
+    'step': ('step.wav', 1, 1, 0.5),
+    'dig': ('zemlia.wav', 2, 2, 0.8),
+    'fall': ('padenie.wav', 3, 2, 0.7),
+    'land': ('upal.wav', 4, 3, 0.9),
+    'collect': ('getalmaz.wav', 6, 2, 1.0),
+    'all_collected': ('vse_almazi.wav', 8, 1, 1.0),
+    'select': ('select.wav', 7, 1, 1.0),
+    'death': ('game_die.wav', 9, 1, 1.0),
+    'level_complete': ('game_ok.wav', 9, 1, 1.0),
+}
+
+# Настройки микшера (выбираются в config.AUDIO_PRESET): частота, формат, каналы,
+# размер буфера в сэмплах и количество каналов для звуков (музыка играет отдельно).
+# Задержка звука - примерно buffer / frequency: 512 при 44100 Гц дают около 12 мс
+AUDIO_PRESETS = {
+    'default': {'frequency': 44100, 'size': -16, 'channels': 2, 'buffer': 512, 'sound_channels': 8},
+    # Игровые автоматы: минимальная задержка ценой более частого заполнения буфера
+    'low_latency': {'frequency': 44100, 'size': -16, 'channels': 2, 'buffer': 256, 'sound_channels': 8},
+    # Киоски: моно, половинная частота, крупный буфер и меньше одновременных звуков
+    'low_cpu': {'frequency': 22050, 'size': -16, 'channels': 1, 'buffer': 2048, 'sound_channels': 4},
+}
+# Сколько последних замеров задержки хранить для отчета
+LATENCY_SAMPLES = 256
+# Звуки, которые запускает клавиша движения: задержка замеряется до них
+LATENCY_EVENTS = ('step', 'dig')
+# Нажатие, за которым столько мс не последовал звук движения (игрок уперся в стену), не замеряется
+LATENCY_TIMEOUT_MS = 500
+
+
+def get_audio_preset(name):
+    """Настройки микшера по имени пресета (неизвестное имя - настройки по умолчанию)"""
+    if name not in AUDIO_PRESETS:
+        print(f"Неизвестный пресет звука {name}, используется default")
+        name = 'default'
+    return name, AUDIO_PRESETS[name]
+
+
+def pre_init_mixer(preset_name):
+    """Настройки микшера до pygame.init: любая инициализация микшера возьмет их"""
+    _, preset = get_audio_preset(preset_name)
+    pygame.mixer.pre_init(preset['frequency'], preset['size'], preset['channels'], preset['buffer'])
+
 
 class SoundManager:
-    def __init__(self):
+    def __init__(self, asset_loader=None, preset_name=None):
+        # Декодированные звуки: файл -> pygame.mixer.Sound (каждый файл декодируется один раз)
         self.sounds = {}
+        # Каналы и их голоса: номер канала -> (событие, приоритет, номер запуска)
+        self.channels = []
+        self.voices = {}
+        self.play_count = 0
+        # События, запрошенные за этот шаг: одинаковые сливаются в один звук (см. update)
+        self.pending_events = set()
+        # Если задан AssetLoader, звуки декодируются в его потоках
+        self.asset_loader = asset_loader
+        self.preset_name, self.preset = get_audio_preset(preset_name or config.AUDIO_PRESET)
+        # Фактические настройки микшера (frequency, size, channels) после init_audio
+        self.mixer_settings = None
+        # Замер задержки: время (мс pygame.time.get_ticks) первого нажатия клавиши движения,
+        # еще не получившего звук, и задержки в мс по звукам движения
+        self.input_time = None
+        self.latencies = {event: deque(maxlen=LATENCY_SAMPLES) for event in LATENCY_EVENTS}
         self.music_volume = 0.7
         self.sound_volume = 0.8
         
-        # Создаем папки для звуков если их нет
-        self.create_sound_folders()
-        self.load_sounds()
+        # Микшер и звуки инициализируются при первом обращении к звуку (init_audio)
+        self.audio_ready = False
+        self.audio_available = False
+    
+    def init_audio(self):
+        """Инициализация микшера и загрузка звуков (один раз, при первой необходимости)"""
+        if self.audio_ready:
+            return self.audio_available
+        self.audio_ready = True
+        
+        preset = self.preset
+        try:
+            # Уже включенный микшер (например, после pygame.init) не переинициализируем
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(preset['frequency'], preset['size'], preset['channels'], preset['buffer'])
+        except pygame.error as e:
+            print(f"Звук недоступен: {e}")
+            return False
+        self.audio_available = True
+        self.mixer_settings = pygame.mixer.get_init()
+        pygame.mixer.set_num_channels(preset['sound_channels'])
+        self.channels = [pygame.mixer.Channel(index) for index in range(preset['sound_channels'])]
+        
+        if self.asset_loader is not None:
+            self.load_sounds_async()
+        else:
+            self.load_sounds()
+        return True
     
-    def create_sound_folders(self):
-        """Создание папок для звуков"""
-        sound_dirs = ["assets/sounds", "assets/music"]
-        for dir_path in sound_dirs:
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path)
-                print(f"Создана папка: {dir_path}")
+    def get_sound_paths(self):
+        """Существующие файлы звуков манифеста: [(файл, путь)] без повторов"""
+        paths = []
+        for filename in sorted({entry[0] for entry in SOUND_MANIFEST.values()}):
+            sound_path = os.path.join(config.ASSETS_PATH, filename)
+            # Отсутствующие файлы пропускаем молча для чистоты вывода
+            if os.path.exists(sound_path):
+                paths.append((filename, sound_path))
+        return paths
     
     def load_sounds(self):
         """Загрузка звуков"""
-        sound_files = {
-            'move': 'move.wav',
-            'collect': 'collect.wav',
-            'dig': 'dig.wav',
-            'death': 'death.wav',
-            'level_complete': 'complete.wav'
-        }
+        for filename, sound_path in self.get_sound_paths():
+            try:
+                self.add_sound(filename, pygame.mixer.Sound(sound_path))
+            except pygame.error as e:
+                print(f"Ошибка загрузки звука {filename}: {e}")
+    
+    def load_sounds_async(self):
+        """Декодирование звуков в потоках AssetLoader; звук играет, когда загрузится"""
+        for filename, sound_path in self.get_sound_paths():
+            self.asset_loader.add(f"sound:{filename}", pygame.mixer.Sound, sound_path,
+                                  on_done=lambda sound, name=filename: self.add_sound(name, sound))
+    
+    def add_sound(self, filename, sound):
+        """Регистрация загруженного звука"""
+        self.sounds[filename] = sound
+        print(f"Загружен звук: {filename}")
+    
+    def play_sound(self, event):
+        """Запрос звука события; звуки запускаются в update, повторы за шаг сливаются"""
+        if event in SOUND_MANIFEST:
+            self.pending_events.add(event)
+    
+    def mark_input(self, timestamp=None):
+        """Нажатие клавиши движения в момент timestamp (мс pygame.time.get_ticks, по умолчанию - сейчас)
+
+        От него отсчитывается задержка до звука шага или копания, который это нажатие вызвало.
+        """
+        if self.input_time is None:
+            self.input_time = pygame.time.get_ticks() if timestamp is None else timestamp
+    
+    def get_buffer_ms(self):
+        """Длительность буфера микшера в мс (0, если микшер не инициализирован)"""
+        if self.mixer_settings is None:
+            return 0.0
+        return self.preset['buffer'] / self.mixer_settings[0] * 1000
+    
+    def update(self):
+        """Запуск звуков, запрошенных за шаг: сначала более важные"""
+        started = []
+        if self.pending_events:
+            events = sorted(self.pending_events, key=lambda event: -SOUND_MANIFEST[event][1])
+            self.pending_events.clear()
+            if self.init_audio():
+                started = [event for event in events if self.start_voice(event) is not None]
         
-        for sound_name, filename in sound_files.items():
-            sound_path = os.path.join("assets", "sounds", filename)
-            if os.path.exists(sound_path):
-                try:
-                    self.sounds[sound_name] = pygame.mixer.Sound(sound_path)
-                    self.sounds[sound_name].set_volume(self.sound_volume)
-                    print(f"Загружен звук: {sound_name}")
-                except pygame.error as e:
-                    print(f"Ошибка загрузки звука {sound_name}: {e}")
-            # Убираем сообщения об отсутствующих файлах для чистоты вывода
+        if self.input_time is not None:
+            elapsed = pygame.time.get_ticks() - self.input_time
+            triggered = [event for event in started if event in LATENCY_EVENTS]
+            if triggered:
+                # Звук попадает в буфер микшера и выходит после его проигрывания
+                self.latencies[triggered[0]].append(elapsed + self.get_buffer_ms())
+                self.input_time = None
+            elif elapsed > LATENCY_TIMEOUT_MS:
+                self.input_time = None
     
-    def play_sound(self, sound_name):
-        """Воспроизведение звука"""
-        if sound_name in self.sounds:
-            self.sounds[sound_name].play()
+    def start_voice(self, event):
+        """Запуск звука на канале с учетом лимита голосов и приоритета, возвращает канал или None"""
+        filename, priority, max_voices, volume = SOUND_MANIFEST[event]
+        sound = self.sounds.get(filename)
+        if sound is None:
+            return None
+        
+        # Занятые каналы: (номер запуска, номер канала, событие, приоритет)
+        busy = []
+        free = None
+        for index, channel in enumerate(self.channels):
+            if channel.get_busy() and index in self.voices:
+                event_name, voice_priority, started = self.voices[index]
+                busy.append((started, index, event_name, voice_priority))
+            elif free is None:
+                free = index
+        busy.sort()
+        
+        # Лимит голосов события: перезапускаем его самый старый голос
+        same = [voice for voice in busy if voice[2] == event]
+        if len(same) >= max_voices:
+            free = same[0][1]
+        elif free is None:
+            # Свободных каналов нет: занимаем самый старый из менее важных
+            lower = [voice for voice in busy if voice[3] < priority]
+            if not lower:
+                return None
+            free = min(lower, key=lambda voice: (voice[3], voice[0]))[1]
+        
+        channel = self.channels[free]
+        channel.stop()
+        channel.set_volume(self.sound_volume * volume)
+        channel.play(sound)
+        self.play_count += 1
+        self.voices[free] = (event, priority, self.play_count)
+        return channel
     
     def play_music(self, music_file):
-        """Воспроизведение фоновой музыки"""
-        music_path = os.path.join("assets", "music", music_file)
-        if os.path.exists(music_path):
-            try:
-                pygame.mixer.music.load(music_path)
-                pygame.mixer.music.set_volume(self.music_volume)
-                pygame.mixer.music.play(-1)  # Зацикливание
-                print(f"Воспроизводится музыка: {music_file}")
-            except pygame.error as e:
-                print(f"Ошибка воспроизведения музыки: {e}")
+        """Воспроизведение фоновой музыки из assets (файл читается с диска по частям)"""
+        music_path = os.path.join(config.ASSETS_PATH, music_file)
+        if not os.path.exists(music_path) or not self.init_audio():
+            return
+        try:
+            # pygame.mixer.music декодирует поток во время игры, а не загружает файл целиком
+            pygame.mixer.music.load(music_path)
+            pygame.mixer.music.set_volume(self.music_volume)
+            pygame.mixer.music.play(-1)  # Зацикливание
+            print(f"Воспроизводится музыка: {music_file}")
+        except pygame.error as e:
+            print(f"Ошибка воспроизведения музыки: {e}")
     
     def stop_music(self):
         """Остановка музыки"""
-        pygame.mixer.music.stop()
+        if self.audio_available:
+            pygame.mixer.music.stop()
     
     def set_sound_volume(self, volume):
         """Установка громкости звуков"""
         self.sound_volume = max(0.0, min(1.0, volume))
-        for sound in self.sounds.values():
-            sound.set_volume(self.sound_volume)
+        # Громкость канала задается при запуске звука; меняем и у звучащих
+        for index, (event, _, _) in self.voices.items():
+            self.channels[index].set_volume(self.sound_volume * SOUND_MANIFEST[event][3])
     
     def set_music_volume(self, volume):
         """Установка громкости музыки"""
         self.music_volume = max(0.0, min(1.0, volume))
-        pygame.mixer.music.set_volume(self.music_volume)
+        # Без микшера громкость просто запоминается и применится в play_music
+        if self.audio_available:
+            pygame.mixer.music.set_volume(self.music_volume)
+    
+    def get_latency_report(self):
+        """Отчет о задержке звука: настройки микшера и время от нажатия до запуска звука"""
+        preset = self.preset
+        lines = [f"Пресет звука: {self.preset_name}"]
+        if self.mixer_settings is None:
+            lines.append("Микшер не инициализирован")
+            return "\n".join(lines)
+        
+        frequency, size, channels = self.mixer_settings
+        buffer_ms = self.get_buffer_ms()
+        lines.append(f"Микшер: {frequency} Гц, {abs(size)} бит, каналов {channels}, "
+                     f"буфер {preset['buffer']} ({buffer_ms:.1f} мс), звуковых каналов {len(self.channels)}")
+        lines.append("Клавиша движения -> выход звука (очередь событий, шаги игры, запуск канала и буфер микшера):")
+        if not any(self.latencies.values()):
+            lines.append("  замеров задержки нет")
+            return "\n".join(lines)
+        
+        for event, samples in self.latencies.items():
+            if not samples:
+                continue
+            latencies = sorted(samples)
+            p50 = latencies[len(latencies) // 2]
+            p90 = latencies[min(len(latencies) - 1, len(latencies) * 9 // 10)]
+            lines.append(f"  {event} ({len(latencies)} замеров): "
+                         f"p50 {p50:.1f} мс, p90 {p90:.1f} мс, max {latencies[-1]:.1f} мс")
+        return "\n".join(lines)
@@ -1,108 +1,221 @@
-import pygame
+import hashlib
+import io
+import json
 import os
+import struct
+import pygame
+import config
+
+SPRITE_SIZE = 64
+# Спрайты в art.png: имя -> клетки (столбец, ряд) кадров
+SPRITE_LAYOUT = (
+    # Основные элементы (первый ряд) и выход (дверь)
+    ('empty', ((0, 0),)),
+    ('earth', ((1, 0),)),
+    ('brick_wall', ((2, 0),)),
+    ('stone', ((3, 0),)),
+    ('exit', ((4, 0),)),
+    # Анимация героя (третий ряд) и кристалла (седьмой ряд)
+    ('hero', tuple((i, 2) for i in range(4))),
+    ('crystal', tuple((i, 6) for i in range(4))),
+    # Червяк и пузырь (если есть в спрайт-листе)
+    ('worm', ((5, 0),)),
+    ('bubble', ((6, 0),)),
+)
+# Спрайты, которые хранятся списком кадров
+ANIMATIONS = {'hero', 'crystal'}
+
+# Кэш обработанного атласа: magic 'ESSA', версия, хэш исходников, длина таблицы кадров,
+# затем таблица кадров (JSON) и атлас в PNG
+ATLAS_VERSION = 1
+ATLAS_MAGIC = b'ESSA'
+ATLAS_HEADER = struct.Struct('<4sH16sI')
+
 
 class SpriteLoader:
-    def __init__(self):
+    def __init__(self, asset_loader=None):
         self.sprites = {}
-        self.load_sprites()
-    
+        if asset_loader is not None:
+            # Декодирование в потоке AssetLoader, спрайты появятся после process_finished
+            asset_loader.add('sprites', self.decode_sprites, on_done=self.finish_loading, required=True)
+        else:
+            self.load_sprites()
+
     def load_sprites(self):
-        """Загрузка спрайтов из art.png"""
-        art_path = os.path.join("assets", "art.png")
-        
+        """Загрузка спрайтов: атлас из кэша или, если art.png изменился, обработка art.png"""
+        self.finish_loading(self.decode_sprites())
+
+    def decode_sprites(self):
+        """Чтение и декодирование PNG (можно вызывать из потока загрузки)
+
+        Возвращает ('atlas', атлас, таблица кадров) из кэша, ('sheet', спрайт-лист,
+        ключ кэша) или None, если art.png нет или он не читается.
+        """
+        art_path = os.path.join(config.ASSETS_PATH, config.SPRITES_FILE)
         if not os.path.exists(art_path):
             print(f"Файл {art_path} не найден. Создаю заглушки...")
-            self.create_placeholder_sprites()
-            return
-            
+            return None
+
         try:
+            source_key = self.get_source_key(art_path)
+            cached = self.load_atlas_cache(config.SPRITE_CACHE_PATH, source_key)
+            if cached:
+                print(f"Спрайты загружены из кэша: {config.SPRITE_CACHE_PATH}")
+                return ('atlas', *cached)
+
             # Загружаем основной файл спрайтов
-            sprite_sheet = pygame.image.load(art_path).convert_alpha()
+            sprite_sheet = pygame.image.load(art_path)
             print(f"Загружен файл спрайтов: {art_path}")
-            
-            # Размеры спрайта
-            sprite_size = 64
-            
-            # Извлекаем спрайты
-            self.extract_sprites(sprite_sheet, sprite_size)
-            print("Спрайты успешно загружены")
-            
-        except pygame.error as e:
+            return ('sheet', sprite_sheet, source_key)
+        except (OSError, pygame.error) as e:
             print(f"Ошибка загрузки {art_path}: {e}")
+            return None
+
+    def finish_loading(self, decoded):
+        """Подготовка декодированных спрайтов к отрисовке (только в главном потоке)"""
+        if decoded is None:
             self.create_placeholder_sprites()
-    
-    def extract_sprites(self, sprite_sheet, sprite_size):
-        """Извлечение спрайтов из спрайт-листа"""
-        
-        # Основные элементы (первый ряд)
-        self.sprites['empty'] = self.get_sprite_from_sheet(sprite_sheet, 0, 0, sprite_size)
-        self.sprites['earth'] = self.get_sprite_from_sheet(sprite_sheet, 1, 0, sprite_size)
-        self.sprites['brick_wall'] = self.get_sprite_from_sheet(sprite_sheet, 2, 0, sprite_size)
-        self.sprites['stone'] = self.get_sprite_from_sheet(sprite_sheet, 3, 0, sprite_size)
-        
-        # Выход (дверь)
-        self.sprites['exit'] = self.get_sprite_from_sheet(sprite_sheet, 4, 0, sprite_size)
-        
-        # Анимация героя (третий ряд)
-        self.sprites['hero'] = []
-        for i in range(4):
-            self.sprites['hero'].append(self.get_sprite_from_sheet(sprite_sheet, i, 2, sprite_size))
-        
-        # Анимация кристалла (седьмой ряд)
-        self.sprites['crystal'] = []
-        for i in range(4):
-            self.sprites['crystal'].append(self.get_sprite_from_sheet(sprite_sheet, i, 6, sprite_size))
-        
-        # Дополнительные объекты (если есть в спрайт-листе)
-        # Червяк (можно взять из другого ряда или использовать заглушку)
-        self.sprites['worm'] = self.get_sprite_from_sheet(sprite_sheet, 5, 0, sprite_size)
-        
-        # Пузырь
-        self.sprites['bubble'] = self.get_sprite_from_sheet(sprite_sheet, 6, 0, sprite_size)
-    
-    def get_sprite_from_sheet(self, sprite_sheet, col, row, sprite_size):
-        """Извлечение одного спрайта из листа"""
-        rect = pygame.Rect(col * sprite_size, row * sprite_size, sprite_size, sprite_size)
-        sprite = pygame.Surface((sprite_size, sprite_size), pygame.SRCALPHA)
-        sprite.blit(sprite_sheet, (0, 0), rect)
-        return sprite
-    
+            return
+
+        kind, image, extra = decoded
+        if kind == 'atlas':
+            self.set_sprites_from_atlas(image, extra)
+            return
+
+        try:
+            atlas, frames = self.build_atlas(image.convert_alpha(), SPRITE_SIZE)
+        except pygame.error as e:
+            print(f"Ошибка обработки спрайтов: {e}")
+            self.create_placeholder_sprites()
+            return
+        self.save_atlas_cache(config.SPRITE_CACHE_PATH, extra, atlas, frames)
+        self.set_sprites_from_atlas(atlas, frames)
+        print("Спрайты успешно загружены")
+
+    def get_source_key(self, art_path):
+        """Хэш содержимого исходного PNG и раскладки спрайтов (ключ кэша атласа)"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((ATLAS_VERSION, SPRITE_SIZE, SPRITE_LAYOUT)).encode())
+        with open(art_path, 'rb') as f:
+            digest.update(f.read())
+        return digest.digest()
+
+    def build_atlas(self, sprite_sheet, sprite_size):
+        """Сборка атласа из используемых кадров спрайт-листа
+
+        Непрозрачные кадры идут в начале атласа, кадры с прозрачностью - после них.
+        Возвращает атлас и таблицу кадров: имя -> список (x, y) в атласе, плюс
+        ширину непрозрачной части.
+        """
+        cells = []
+        for name, frames in SPRITE_LAYOUT:
+            for col, row in frames:
+                rect = pygame.Rect(col * sprite_size, row * sprite_size, sprite_size, sprite_size)
+                if not sprite_sheet.get_rect().contains(rect):
+                    continue
+                frame = sprite_sheet.subsurface(rect)
+                # Кадр непрозрачен, если у всех пикселей альфа 255
+                opaque = pygame.mask.from_surface(frame, 254).count() == sprite_size * sprite_size
+                cells.append((not opaque, name, frame))
+        # Сортировка устойчивая: порядок кадров внутри анимации сохраняется
+        cells.sort(key=lambda cell: cell[0])
+
+        atlas = pygame.Surface((max(1, len(cells)) * sprite_size, sprite_size), pygame.SRCALPHA)
+        frames = {'size': sprite_size, 'opaque_width': 0, 'sprites': {}}
+        for index, (transparent, name, frame) in enumerate(cells):
+            atlas.blit(frame, (index * sprite_size, 0))
+            frames['sprites'].setdefault(name, []).append((index * sprite_size, 0))
+            if not transparent:
+                frames['opaque_width'] = (index + 1) * sprite_size
+        return atlas, frames
+
+    def set_sprites_from_atlas(self, atlas, frames):
+        """Спрайты - подповерхности атласа: непрозрачная часть через convert(), остальное convert_alpha()"""
+        size = frames['size']
+        opaque_width = frames['opaque_width']
+        parts = []
+        if opaque_width:
+            parts.append((0, atlas.subsurface((0, 0, opaque_width, size)).convert()))
+        if opaque_width < atlas.get_width():
+            parts.append((opaque_width, atlas.subsurface(
+                (opaque_width, 0, atlas.get_width() - opaque_width, size)).convert_alpha()))
+
+        self.sprites = {}
+        for name, positions in frames['sprites'].items():
+            sprites = []
+            for x, y in positions:
+                part_x, part = [(part_x, part) for part_x, part in parts if part_x <= x][-1]
+                sprites.append(part.subsurface((x - part_x, y, size, size)))
+            self.sprites[name] = sprites if name in ANIMATIONS else sprites[0]
+
+    def load_atlas_cache(self, path, source_key):
+        """Атлас и таблица кадров из кэша или None, если кэша нет или он от других исходников"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, version, key, table_size = ATLAS_HEADER.unpack_from(data, 0)
+            if magic != ATLAS_MAGIC or version != ATLAS_VERSION or key != source_key:
+                return None
+            table_end = ATLAS_HEADER.size + table_size
+            frames = json.loads(data[ATLAS_HEADER.size:table_end])
+            # Единственное декодирование PNG при загрузке из кэша
+            atlas = pygame.image.load(io.BytesIO(data[table_end:]), 'atlas.png')
+            return atlas, frames
+        except (OSError, ValueError, struct.error, pygame.error):
+            return None
+
+    def save_atlas_cache(self, path, source_key, atlas, frames):
+        """Запись атласа и таблицы кадров в кэш"""
+        try:
+            image = io.BytesIO()
+            pygame.image.save(atlas, image, 'atlas.png')
+            table = json.dumps(frames).encode()
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(ATLAS_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, source_key, len(table)))
+                f.write(table)
+                f.write(image.getvalue())
+            os.replace(temp_path, path)
+        except (OSError, pygame.error) as e:
+            print(f"Не удалось сохранить кэш спрайтов {path}: {e}")
+
     def create_placeholder_sprites(self):
         """Создание заглушек если файл не найден"""
-        sprite_size = 64
-        
+        sprite_size = SPRITE_SIZE
+
         # Создаем простые цветные квадраты как заглушки
         self.sprites['empty'] = self.create_colored_sprite(sprite_size, (0, 0, 0))
         self.sprites['earth'] = self.create_colored_sprite(sprite_size, (139, 69, 19))
         self.sprites['brick_wall'] = self.create_colored_sprite(sprite_size, (165, 42, 42))
         self.sprites['stone'] = self.create_colored_sprite(sprite_size, (128, 128, 128))
-        
+
         # Выход (дверь) - яркий цвет
         self.sprites['exit'] = self.create_colored_sprite(sprite_size, (255, 215, 0))  # Золотой
-        
+
         # Анимация героя
         self.sprites['hero'] = []
         colors = [(0, 255, 0), (0, 200, 0), (0, 255, 50), (0, 200, 50)]
+        font = pygame.font.Font(None, 24)
         for i, color in enumerate(colors):
             sprite = self.create_colored_sprite(sprite_size, color)
             # Добавляем номер кадра
-            font = pygame.font.Font(None, 24)
             text = font.render(str(i+1), True, (255, 255, 255))
             sprite.blit(text, (sprite_size//2 - 6, sprite_size//2 - 12))
             self.sprites['hero'].append(sprite)
-        
+
         # Анимация кристалла
         self.sprites['crystal'] = []
         crystal_colors = [(255, 0, 255), (255, 50, 255), (255, 100, 255), (255, 150, 255)]
         for color in crystal_colors:
             self.sprites['crystal'].append(self.create_colored_sprite(sprite_size, color))
-        
+
         # Червяк
         self.sprites['worm'] = self.create_colored_sprite(sprite_size, (255, 100, 100))
-        
+
         # Пузырь
         self.sprites['bubble'] = self.create_colored_sprite(sprite_size, (0, 255, 255))
-        
+
         print("Созданы цветные заглушки для спрайтов")
 
     def create_colored_sprite(self, size, color):
@@ -111,7 +224,7 @@ class SpriteLoader:
         sprite.fill(color)
         pygame.draw.rect(sprite, (255, 255, 255), sprite.get_rect(), 2)
         return sprite
-    
+
     def get_sprite(self, name):
         """Получение спрайта по имени"""
         return self.sprites.get(name, None)
@@ -0,0 +1,114 @@
+import math
+from collections import OrderedDict
+import pygame
+
+# Память под поверхности чанков по умолчанию: 8 полных чанков 16x16 тайлов (по 4 МБ при 32 bpp)
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class TerrainCache:
+    """Кэш статичного слоя тайлов: карта разбита на чанки, каждый чанк - готовая поверхность"""
+
+    def __init__(self, level, chunk_size=16, max_bytes=DEFAULT_MAX_BYTES):
+        self.level = level
+        self.chunk_size = chunk_size  # в тайлах
+        self.chunk_pixels = chunk_size * level.tile_size
+        # (chunk_x, chunk_y) -> pygame.Surface, от давно использованных к недавним
+        self.chunks = OrderedDict()
+        # Больше памяти под поверхности не тратим: удаляются давно не показанные чанки (важно для больших карт)
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """Получение поверхности чанка (строится при первом обращении)"""
+        key = (chunk_x, chunk_y)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.build_chunk(chunk_x, chunk_y)
+            self.chunks[key] = chunk
+            self.used_bytes += self.get_chunk_bytes(chunk)
+            self.evict(keep=key)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def get_chunk_bytes(self, chunk):
+        """Память под поверхность чанка"""
+        return chunk.get_pitch() * chunk.get_height()
+
+    def evict(self, keep=None):
+        """Удаление давно не показанных чанков по одному, пока кэш не уложится в max_bytes"""
+        while self.used_bytes > self.max_bytes and len(self.chunks) > 1:
+            key = next(iter(self.chunks))
+            if key == keep:
+                break
+            self.used_bytes -= self.get_chunk_bytes(self.chunks.pop(key))
+
+    def build_chunk(self, chunk_x, chunk_y):
+        """Отрисовка всех тайлов чанка на новую поверхность"""
+        level = self.level
+        tile_x0 = chunk_x * self.chunk_size
+        tile_y0 = chunk_y * self.chunk_size
+        tiles_w = min(self.chunk_size, level.width - tile_x0)
+        tiles_h = min(self.chunk_size, level.height - tile_y0)
+
+        surface = pygame.Surface((tiles_w * level.tile_size, tiles_h * level.tile_size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill((0, 0, 0))
+
+        for y in range(tiles_h):
+            for x in range(tiles_w):
+                level.draw_tile(surface, tile_x0 + x, tile_y0 + y,
+                                x * level.tile_size, y * level.tile_size)
+        return surface
+
+    def invalidate_tile(self, tile_x, tile_y):
+        """Перерисовка одной клетки в уже построенном чанке"""
+        chunk_key = (tile_x // self.chunk_size, tile_y // self.chunk_size)
+        chunk = self.chunks.get(chunk_key)
+        if chunk is None:
+            return  # Чанк еще не строился - нарисуется с актуальными данными
+
+        local_x = (tile_x % self.chunk_size) * self.level.tile_size
+        local_y = (tile_y % self.chunk_size) * self.level.tile_size
+        chunk.fill((0, 0, 0), (local_x, local_y, self.level.tile_size, self.level.tile_size))
+        self.level.draw_tile(chunk, tile_x, tile_y, local_x, local_y)
+
+    def clear(self):
+        """Сброс всех построенных чанков"""
+        self.chunks.clear()
+        self.used_bytes = 0
+
+    def render(self, screen, camera_x, camera_y):
+        """Отрисовка видимой части слоя тайлов, возвращает количество blit-ов"""
+        view_width, view_height = screen.get_size()
+        level_pixel_w = self.level.width * self.level.tile_size
+        level_pixel_h = self.level.height * self.level.tile_size
+
+        # Точка мира X рисуется в math.floor(X - camera_x), как объекты и игрок:
+        # первый столбец экрана - точка math.ceil(camera_x)
+        origin_x = math.ceil(camera_x)
+        origin_y = math.ceil(camera_y)
+        left = max(0, origin_x)
+        top = max(0, origin_y)
+        right = min(level_pixel_w, origin_x + view_width)
+        bottom = min(level_pixel_h, origin_y + view_height)
+
+        blits = 0
+        for chunk_y in range(top // self.chunk_pixels, (bottom - 1) // self.chunk_pixels + 1):
+            for chunk_x in range(left // self.chunk_pixels, (right - 1) // self.chunk_pixels + 1):
+                chunk_left = chunk_x * self.chunk_pixels
+                chunk_top = chunk_y * self.chunk_pixels
+                # Видимая часть чанка в его локальных координатах
+                area = pygame.Rect(max(left, chunk_left) - chunk_left,
+                                   max(top, chunk_top) - chunk_top,
+                                   min(right, chunk_left + self.chunk_pixels) - max(left, chunk_left),
+                                   min(bottom, chunk_top + self.chunk_pixels) - max(top, chunk_top))
+                if area.width <= 0 or area.height <= 0:
+                    continue
+                screen.blit(self.get_chunk(chunk_x, chunk_y),
+                            (math.floor(chunk_left + area.x - camera_x), math.floor(chunk_top + area.y - camera_y)),
+                            area)
+                blits += 1
+        return blits
@@ -0,0 +1,122 @@
+# Коды тайлов совпадают с кодами карт из оригинальной Java версии (см. LevelData.TILE_MAPPING)
+EMPTY = 0
+EARTH = 1
+BRICK_WALL = 2
+STONE = 3
+PLAYER = 4
+FIRE = 5
+CRYSTAL = 6
+WORM = 7
+BUBBLE = 8
+EXIT = 10
+
+TILE_CODES = {
+    'empty': EMPTY,
+    'earth': EARTH,
+    'brick_wall': BRICK_WALL,
+    'stone': STONE,
+    'player': PLAYER,
+    'fire': FIRE,
+    'crystal': CRYSTAL,
+    'worm': WORM,
+    'bubble': BUBBLE,
+    'exit': EXIT
+}
+
+# Обратная таблица: код -> имя тайла (неизвестные коды считаются стеной)
+TILE_NAMES = ['brick_wall'] * 256
+for _name, _code in TILE_CODES.items():
+    TILE_NAMES[_code] = _name
+
+
+class TileGrid:
+    """Компактная карта тайлов: один байт на клетку в непрерывном буфере"""
+
+    def __init__(self, width, height, fill=EMPTY, data=None):
+        self.width = width
+        self.height = height
+        if data is not None:
+            if len(data) != width * height:
+                raise ValueError(f"Размер данных {len(data)} не совпадает с картой {width}x{height}")
+            self.data = bytearray(data)
+        else:
+            self.data = bytearray([fill]) * (width * height)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Создание карты из списка строк с целочисленными кодами"""
+        height = len(rows)
+        width = len(rows[0]) if height else 0
+        data = bytearray()
+        for row in rows:
+            data += bytes(row)
+        return cls(width, height, data=data)
+
+    @classmethod
+    def random_fill(cls, width, height, rng, weights=((EARTH, 0.3), (STONE, 0.05))):
+        """Случайное заполнение всей карты за один проход (остаток - пустота) из генератора rng"""
+        # Таблица перевода случайного байта в код тайла
+        table = bytearray([EMPTY]) * 256
+        start = 0
+        for code, probability in weights:
+            end = min(256, start + int(round(probability * 256)))
+            table[start:end] = bytes([code]) * (end - start)
+            start = end
+        size = width * height
+        noise = rng.getrandbits(8 * size).to_bytes(size, 'little') if size else b''
+        return cls(width, height, data=noise.translate(table))
+
+    def in_bounds(self, x, y):
+        """Проверка, находится ли клетка внутри карты"""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        """Код тайла в клетке (без проверки границ)"""
+        return self.data[y * self.width + x]
+
+    def set(self, x, y, code):
+        """Установка кода тайла в клетке (без проверки границ)"""
+        self.data[y * self.width + x] = code
+
+    def row(self, y):
+        """Строка карты как bytes"""
+        start = y * self.width
+        return bytes(self.data[start:start + self.width])
+
+    def fill_rect(self, x, y, width, height, code):
+        """Заполнение прямоугольника одним кодом"""
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width, x + width), min(self.height, y + height)
+        if x0 >= x1:
+            return
+        chunk = bytes([code]) * (x1 - x0)
+        for row_y in range(y0, y1):
+            start = row_y * self.width + x0
+            self.data[start:start + len(chunk)] = chunk
+
+    def fill_border(self, code):
+        """Заполнение границ карты одним кодом"""
+        self.fill_rect(0, 0, self.width, 1, code)
+        self.fill_rect(0, self.height - 1, self.width, 1, code)
+        self.data[0::self.width] = bytes([code]) * self.height
+        self.data[self.width - 1::self.width] = bytes([code]) * self.height
+
+    def count(self, code):
+        """Количество клеток с данным кодом"""
+        return self.data.count(code)
+
+    def positions(self, code):
+        """Координаты всех клеток с данным кодом"""
+        needle = bytes([code])
+        index = self.data.find(needle)
+        while index != -1:
+            yield index % self.width, index // self.width
+            index = self.data.find(needle, index + 1)
+
+    def to_rows(self):
+        """Преобразование в список строк с кодами"""
+        return [list(self.row(y)) for y in range(self.height)]
+
+    def copy(self):
+        """Копия карты"""
+        return TileGrid(self.width, self.height, data=self.data)